@@ -3,11 +3,39 @@ from flask_cors import CORS
 from datetime import timedelta
 from src.auth import auth
 from src.misc import db, bcrypt, jwt, socketio, Message
+from src.utility import migrateReactions, provisionUsers
+from src.writer import message_writer
+from src.storage import configure_storage
+from src.state import shared_state
+from src.scaleout import message_queue_options
+from src.presence import presence_tracker
+from src.typing_indicators import typing_indicators
+from src.identity_cache import identity_cache
+from src.hashing import password_hasher
+from src.history_cache import history_cache
+from src.retention import retention_manager
+from src.wire import WireJSON, broadcaster
+from src.metrics import metrics
+from src.responder import ai_responder
+from src.intents import INTENTS_FILE, intent_matcher
+from src.ratelimit import rate_limiter
+from src.membership import membership
+from src.dispatcher import dispatcher
+from src.search import ensure_search_index, rebuild_search_index
+from sqlalchemy import text
+from werkzeug.serving import WSGIRequestHandler
+import click
+import csv
+import json
 import logging
+import os
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+class NoDelayRequestHandler(WSGIRequestHandler):
+    disable_nagle_algorithm = True
+
 app = Flask(__name__)
 
 CORS(app,
@@ -22,9 +50,10 @@ socketio.init_app(app,
                   logger=False,
                   engineio_logger=False,
                   ping_timeout=60,
-                  ping_interval=25)
+                  ping_interval=25,
+                  json=WireJSON,
+                  **message_queue_options(os.environ.get('MESSAGE_QUEUE')))
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 
@@ -35,16 +64,166 @@ app.config['JWT_TOKEN_LOCATION'] = ['headers']
 app.config['JWT_HEADER_NAME'] = 'Authorization'
 app.config['JWT_HEADER_TYPE'] = 'Bearer'
 
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+app.config['BCRYPT_POOL_SIZE'] = os.cpu_count() or 1
+app.config['BCRYPT_QUEUE_SIZE'] = app.config['BCRYPT_POOL_SIZE'] * 4
+app.config['BCRYPT_BULK_POOL_SIZE'] = max(1, app.config['BCRYPT_POOL_SIZE'] // 2)
+app.config['BCRYPT_BULK_CONCURRENCY'] = 1
+
+app.config['BULK_PROVISION_LIMIT'] = 10000
+app.config['ADMIN_USERNAMES'] = {name.strip().lower() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+app.config['USER_DIRECTORY_MAX_LIMIT'] = 1000
+
+app.config['IDENTITY_CACHE_SIZE'] = 10000
+app.config['IDENTITY_CACHE_TTL'] = 60
+
+app.config['MESSAGE_QUEUE'] = os.environ.get('MESSAGE_QUEUE')
+app.config['STATE_STORE_URL'] = os.environ.get('STATE_STORE_URL', 'memory://')
+
+app.config['PRESENCE_OFFLINE_TTL'] = 300
+app.config['PRESENCE_BATCH_WINDOW'] = 0.25
+
+app.config['TYPING_TTL'] = 6.0
+app.config['TYPING_REFRESH_INTERVAL'] = 2.0
+app.config['TYPING_TICK'] = 0.3
+
+app.config['HISTORY_CACHE_ENABLED'] = True
+app.config['HISTORY_CACHE_DEPTH'] = 200
+app.config['HISTORY_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+
+app.config['SYNC_MAX_CHANNELS'] = 50
+app.config['SYNC_PER_CHANNEL_LIMIT'] = 200
+app.config['SEARCH_MAX_LIMIT'] = 100
+app.config['SEARCH_RANK_WINDOW'] = 5000
+
+app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', os.path.join(app.instance_path, 'archive'))
+# Retention is opt-in: set RETENTION_DAYS and/or per-channel RETENTION_POLICIES
+# (days) to move older messages out of the database into ARCHIVE_DIR.
+# Archived messages are still served by GET /messages paging, but they no
+# longer appear in /search results, are not returned by /sync or the sync
+# event, and cannot receive reactions.
+app.config['RETENTION_DAYS'] = None
+app.config['RETENTION_POLICIES'] = {}
+app.config['RETENTION_INTERVAL'] = 3600
+app.config['RETENTION_BATCH_SIZE'] = 500
+app.config['ARCHIVE_SEGMENT_MAX_MESSAGES'] = 50000
+
+app.config['METRICS_ENABLED'] = True
+
+app.config['AI_RESPONDER'] = os.environ.get('AI_RESPONDER', 'src.utility:generate_ai_response')
+app.config['AI_RESPONDER_CHANNELS'] = {'erik_ai': {'user_id': 999999, 'username': 'erik_ai'}}
+app.config['AI_RESPONDER_WORKERS'] = 4
+app.config['AI_RESPONDER_QUEUE_SIZE'] = 100
+app.config['AI_RESPONDER_CHANNEL_CONCURRENCY'] = 2
+app.config['AI_INTENTS_FILE'] = os.environ.get('AI_INTENTS_FILE', INTENTS_FILE)
+
+app.config['RATE_LIMIT_ENABLED'] = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+app.config['RATE_LIMITS_PER_SID'] = {
+    'message': (5, 10),
+    'typing': (10, 20),
+    'add_reaction': (5, 15),
+    'user_online': (1, 5),
+    'sync': (2, 5),
+    'subscribe': (1, 5),
+    'join_channel': (5, 20),
+    'leave_channel': (5, 20)
+}
+app.config['RATE_LIMITS_PER_USER'] = {
+    'message': (10, 20),
+    'typing': (20, 40),
+    'add_reaction': (10, 30),
+    'user_online': (2, 10),
+    'sync': (5, 10),
+    'subscribe': (2, 10),
+    'join_channel': (10, 40),
+    'leave_channel': (10, 40)
+}
+app.config['EVENT_PRIORITIES'] = {'typing': 0, 'user_online': 0, 'add_reaction': 1}
+app.config['SHED_IN_FLIGHT'] = 64
+app.config['SHED_LATENCY_MS'] = 250
+
+app.config['MEMBERSHIP_NOTICE_WINDOW'] = 2.0
+app.config['MEMBERSHIP_MAX_SUBSCRIBE'] = 50
+
+app.config['BROADCAST_BATCHING'] = os.environ.get('BROADCAST_BATCHING', '0') == '1'
+app.config['BROADCAST_BATCH_WINDOW_MS'] = 10
+app.config['BROADCAST_BATCH_MAX_EVENTS'] = 50
+app.config['BROADCAST_BATCH_EVENTS'] = ('message', 'reaction_update')
+
+app.config['MESSAGE_WRITE_BEHIND'] = False
+app.config['MESSAGE_WRITE_BATCH_SIZE'] = 200
+app.config['MESSAGE_WRITE_FLUSH_INTERVAL'] = 0.05
+app.config['MESSAGE_WRITE_RETRIES'] = 5
+app.config['MESSAGE_WRITE_RETRY_BACKOFF'] = 0.05
+
+configure_storage(app)
 db.init_app(app)
 bcrypt.init_app(app)
 jwt.init_app(app)
+message_writer.init_app(app)
+shared_state.init_app(app)
+presence_tracker.init_app(app)
+typing_indicators.init_app(app)
+identity_cache.init_app(app)
+password_hasher.init_app(app)
+history_cache.init_app(app)
+broadcaster.init_app(app)
+ai_responder.init_app(app)
+intent_matcher.init_app(app)
+rate_limiter.init_app(app)
+membership.init_app(app)
+dispatcher.init_app(app)
+retention_manager.init_app(app)
 
 app.register_blueprint(auth)
+metrics.init_app(app)
 
 @app.route('/')
 def root():
     return "root api is healthy"
 
+def ensure_indexes():
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def ensure_message_autoincrement(floor=0):
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    with db.engine.begin() as connection:
+        schema = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'message'"
+        )).scalar()
+        rebuilt = schema is not None and 'AUTOINCREMENT' not in schema.upper()
+
+        if rebuilt:
+            existing = {row[1] for row in connection.execute(text("PRAGMA table_info(message)"))}
+            columns = ', '.join(column.name for column in Message.__table__.columns if column.name in existing)
+            dependents = connection.execute(text(
+                "SELECT type, name FROM sqlite_master "
+                "WHERE tbl_name = 'message' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+            )).all()
+
+            connection.execute(text("PRAGMA legacy_alter_table = ON"))
+            for kind, name in dependents:
+                connection.execute(text(f'DROP {kind.upper()} "{name}"'))
+            connection.execute(text("ALTER TABLE message RENAME TO message_legacy"))
+            Message.__table__.create(connection)
+            connection.execute(text(f"INSERT INTO message ({columns}) SELECT {columns} FROM message_legacy"))
+            connection.execute(text("DROP TABLE message_legacy"))
+            connection.execute(text("PRAGMA legacy_alter_table = OFF"))
+
+        sequence = connection.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'message'")).scalar()
+        if sequence is None:
+            connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('message', :seq)"),
+                               {'seq': floor})
+        elif sequence < floor:
+            connection.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'message'"),
+                               {'seq': floor})
+
+    return rebuilt
+
 def seed_initial_messages():
     from datetime import datetime, timedelta
 
@@ -127,10 +306,56 @@ def seed_initial_messages():
         db.session.add(msg)
 
     db.session.commit()
+    migrateReactions()
+
+@app.cli.command('migrate-reactions')
+def migrate_reactions_command():
+    migrated = migrateReactions()
+    print(f"Migrated {migrated} reactions")
+
+@app.cli.command('provision-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def provision_users_command(path):
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            entries = [{'user': row.get('user') or row.get('username'), 'password': row.get('password')}
+                       for row in csv.DictReader(f)]
+        else:
+            entries = [json.loads(line) for line in f if line.strip()]
+
+    results = provisionUsers(entries)
+    created = sum(1 for result in results if result['success'])
+
+    for result in results:
+        if not result['success']:
+            print(f"row {result['index']} ({result['username']}): {result['error']}")
+    print(f"Provisioned {created} of {len(results)} users")
+
+@app.cli.command('compact-history')
+@click.option('--channel', 'channels', multiple=True)
+def compact_history_command(channels):
+    archived = retention_manager.compact(list(channels) or None)
+    for channel_id, count in archived.items():
+        print(f"{channel_id}: archived {count} messages")
+    print(f"Archived {sum(archived.values())} messages")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    rebuild_search_index()
+    print(f"Rebuilt search index over {Message.query.count()} messages")
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        ensure_message_autoincrement(retention_manager.max_archived_id())
+        ensure_indexes()
+        ensure_search_index()
         seed_initial_messages()
 
-    socketio.run(app, debug=True, host='127.0.0.1', port=5001)
\ No newline at end of file
+    retention_manager.start()
+    socketio.run(app,
+                 debug=os.environ.get('DEBUG', '1') == '1',
+                 host='127.0.0.1',
+                 port=int(os.environ.get('PORT', 5001)),
+                 allow_unsafe_werkzeug=os.environ.get('ALLOW_UNSAFE_WERKZEUG') == '1',
+                 request_handler=NoDelayRequestHandler)
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Latency of the keyword-intent matcher behind generate_ai_response.
+
+Run from the backend directory:
+
+    python -m benchmarks.intent_bench --iterations 20000
+
+Each corpus is a set of chat messages of a realistic length: short one-liners,
+typical sentences, and long multi-sentence posts. For every corpus the
+previous implementation (lowercase the message, rebuild the keyword lists and
+run one substring scan per intent) is timed against the word matcher, which
+tokenizes the message once and looks keyword n-grams up by their first word. The "greeting" column counts how many messages each one classifies
+as a greeting, which shows the substring version's misfires on words such as
+"this" and "which". On long messages the substring scan looks cheaper only
+because one of those misfires usually ends it early.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.intents import intent_matcher
+
+WORDS = (
+    'the deploy is done and release notes are in this channel which one of you '
+    'can check whether the build passed on staging before we ship tomorrow it '
+    'looks fine to me but the latency graph shows something odd around noon so '
+    'please take a look when you have time maybe after lunch'
+).split()
+
+PHRASES = ['hi', 'hello there', 'how are you', 'can you help', 'thanks a lot', 'what can you do']
+
+def legacy_intent(user_message):
+    message_lower = user_message.lower()
+    if any(greeting in message_lower for greeting in ['hi', 'hello', 'hey', 'greetings']):
+        return 'greeting'
+    elif any(q in message_lower for q in ['how are you', "how're you", 'how do you do']):
+        return 'wellbeing'
+    elif any(q in message_lower for q in ['what can you do', 'help', 'what do you do']):
+        return 'capabilities'
+    elif any(word in message_lower for word in ['thanks', 'thank you', 'appreciate']):
+        return 'thanks'
+    return None
+
+def build_corpus(rng, words, count):
+    corpus = []
+    for _ in range(count):
+        message = [rng.choice(WORDS) for _ in range(words)]
+        if rng.random() < 0.3:
+            message.insert(rng.randrange(len(message) + 1), rng.choice(PHRASES))
+        corpus.append(' '.join(message).capitalize() + rng.choice('.?!'))
+    return corpus
+
+def measure(classify, corpus, iterations):
+    started = time.perf_counter()
+    for n in range(iterations):
+        classify(corpus[n % len(corpus)])
+    return (time.perf_counter() - started) / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    intent_matcher.load()
+    corpora = [('short', 6), ('sentence', 20), ('long', 80)]
+
+    print(f"{args.iterations} classifications per corpus, {args.messages} distinct messages each")
+    print(f"{'corpus':10} {'words':>6} {'matcher':16} {'us/message':>11} {'greeting':>9}")
+    for name, words in corpora:
+        corpus = build_corpus(rng, words, args.messages)
+        for label, classify in (('substring scan', legacy_intent), ('word lookup', intent_matcher.match)):
+            seconds = measure(classify, corpus, args.iterations)
+            greetings = sum(classify(message) == 'greeting' for message in corpus)
+            print(f"{name:10} {words:6} {label:16} {seconds * 1e6:11.2f} {greetings:9}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
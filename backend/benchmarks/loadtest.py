@@ -0,0 +1,333 @@
+"""Load test for the Socket.IO and REST hot paths of a local app.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --clients 50 --duration 30 --record baseline.json
+    python -m benchmarks.loadtest --clients 50 --duration 30 --compare baseline.json
+
+app.py is started as a subprocess against a temporary database and archive
+directory on a free local port, so nothing outside the temp dir is touched
+and no network access is needed. Each simulated client signs in, connects,
+sends user_online and join_channel, then loops over message / typing /
+add_reaction events and GET /messages/<channel_id> until the duration
+elapses. A /signin rejected with 503 by the bcrypt pool is counted as an
+error and retried with backoff, like a real client would. Socket events are
+sent with acknowledgements so their latency is the full server round trip;
+message_delivery is the time until the other members of the channel receive
+a broadcast message.
+
+Per-connection rate limits are switched off unless --rate-limit is given, since
+the default think time sends far more events than one person would; with it,
+events rejected or shed by the limiter are counted as errors. --batching
+turns on outbound micro-batching of room broadcasts so its effect on
+message_delivery can be compared against a run without it.
+
+--record writes a JSON baseline with stable key order so it diffs cleanly;
+--compare prints the change against one and exits non-zero when any p95 or
+throughput figure regresses by more than --threshold percent.
+"""
+from collections import defaultdict
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import socketio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHANNELS = ['general', 'random', 'tech', 'gaming']
+
+PASSWORD = 'Zebra!Horse9'
+
+EMOJIS = ['👍', '🎉', '😂', '❤️']
+
+ACTIONS = [('message', 4), ('typing', 4), ('add_reaction', 1), ('history', 1)]
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add(self, event, seconds):
+        with self.lock:
+            self.samples[event].append(seconds)
+
+    def fail(self, event):
+        with self.lock:
+            self.errors[event] += 1
+
+    def time(self, event, call):
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            self.fail(event)
+            return None
+        if isinstance(result, dict) and result.get('error_type') == 'rate_limited':
+            self.fail(event)
+            return None
+        self.add(event, time.perf_counter() - started)
+        return result
+
+    def summary(self, duration):
+        return {
+            event: {
+                'count': len(samples),
+                'errors': self.errors.get(event, 0),
+                'throughput': round(len(samples) / duration, 2),
+                'p50_ms': round(percentile(samples, 50) * 1000, 3),
+                'p95_ms': round(percentile(samples, 95) * 1000, 3),
+                'p99_ms': round(percentile(samples, 99) * 1000, 3)
+            }
+            for event, samples in ((event, self.samples.get(event, []))
+                                   for event in sorted(set(self.samples) | set(self.errors)))
+        }
+
+def start_server(workdir, port, args):
+    env = dict(os.environ,
+               DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+               ARCHIVE_DIR=os.path.join(workdir, 'archive'),
+               PORT=str(port),
+               DEBUG='0',
+               ALLOW_UNSAFE_WERKZEUG='1',
+               RATE_LIMIT_ENABLED='1' if args.rate_limit else '0',
+               BROADCAST_BATCHING='1' if args.batching else '0',
+               BCRYPT_LOG_ROUNDS=str(args.bcrypt_rounds))
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"app.py exited with {server.returncode}, see {log.name}")
+        try:
+            if requests.get(base_url + '/', timeout=1).ok:
+                return server, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError(f"app.py did not start within {args.startup_timeout}s, see {log.name}")
+
+def create_users(base_url, count):
+    usernames = [f'loaduser{n}' for n in range(count)]
+    for username in usernames:
+        response = requests.post(base_url + '/signup', json={'user': username, 'password': PASSWORD}, timeout=60)
+        if response.status_code not in (201, 409):
+            raise RuntimeError(f"signup for {username} failed: {response.status_code} {response.text}")
+    return usernames
+
+def run_client(base_url, username, channel_id, args, recorder, start, stop, rng):
+    http = requests.Session()
+    client = socketio.Client(reconnection=False)
+
+    @client.on('message')
+    def on_message(data):
+        text = data.get('text', '') if isinstance(data, dict) else ''
+        if text.startswith('lt:'):
+            recorder.add('message_delivery', time.perf_counter() - float(text.split(':')[1]))
+
+    @client.on('batch')
+    def on_batch(data):
+        for event, payload in data['events']:
+            if event == 'message':
+                on_message(payload)
+
+    start.wait()
+
+    signin = None
+    for attempt in range(args.signin_retries + 1):
+        started = time.perf_counter()
+        try:
+            signin = http.post(base_url + '/signin', json={'user': username, 'password': PASSWORD}, timeout=30)
+        except requests.RequestException:
+            signin = None
+        if signin is not None and signin.status_code == 200:
+            recorder.add('signin', time.perf_counter() - started)
+            break
+        recorder.fail('signin')
+        if signin is None or signin.status_code != 503:
+            return
+        time.sleep(rng.uniform(0, 0.1 * 2 ** attempt))
+    else:
+        return
+    token = signin.json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def history():
+        response = http.get(f'{base_url}/messages/{channel_id}', headers=headers, timeout=30)
+        response.raise_for_status()
+        return [message['id'] for message in response.json()['messages'] if isinstance(message['id'], int)]
+
+    try:
+        connected = recorder.time('connect', lambda: client.connect(
+            f'{base_url}?token={token}', transports=['websocket'], wait_timeout=10
+        ) or True)
+        if not connected:
+            return
+
+        recorder.time('user_online', lambda: client.call('user_online', timeout=10))
+        recorder.time('join_channel', lambda: client.call('join_channel', {'channel_id': channel_id}, timeout=10))
+        message_ids = recorder.time('history', history) or []
+
+        actions, weights = zip(*ACTIONS)
+        while not stop.is_set():
+            action = rng.choices(actions, weights)[0]
+
+            if action == 'message':
+                recorder.time('message', lambda: client.call('message', {
+                    'channel': channel_id, 'text': f'lt:{time.perf_counter()}'
+                }, timeout=10))
+            elif action == 'typing':
+                recorder.time('typing', lambda: client.call('typing', {
+                    'channel_id': channel_id, 'is_typing': rng.random() < 0.8
+                }, timeout=10))
+            elif action == 'add_reaction' and message_ids:
+                recorder.time('add_reaction', lambda: client.call('add_reaction', {
+                    'message_id': rng.choice(message_ids), 'emoji': rng.choice(EMOJIS)
+                }, timeout=10))
+            elif action == 'history':
+                message_ids = recorder.time('history', history) or message_ids
+
+            if args.think_time:
+                time.sleep(rng.uniform(0, 2 * args.think_time))
+
+    finally:
+        if client.connected:
+            client.disconnect()
+
+def compare(summary, baseline, threshold):
+    regressions = []
+    print(f"\n{'event':18} {'metric':11} {'baseline':>10} {'current':>10} {'change':>8}")
+    for event in sorted(set(summary) | set(baseline)):
+        for metric in ('throughput', 'p50_ms', 'p95_ms', 'p99_ms'):
+            before = baseline.get(event, {}).get(metric)
+            after = summary.get(event, {}).get(metric)
+            if before is None or after is None:
+                print(f"{event:18} {metric:11} {str(before):>10} {str(after):>10} {'n/a':>8}")
+                continue
+
+            change = (after / before - 1) * 100 if before else 0.0
+            worse = -change if metric == 'throughput' else change
+            flag = ''
+            if metric in ('throughput', 'p95_ms') and worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append((event, metric))
+            print(f"{event:18} {metric:11} {before:10.3f} {after:10.3f} {change:+7.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--think-time', type=float, default=0.05,
+                        help='mean pause between actions of one client, in seconds')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12)
+    parser.add_argument('--signin-retries', type=int, default=8,
+                        help='retries with backoff when /signin sheds load with a 503')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the per-connection rate limits and overload shedding enabled')
+    parser.add_argument('--batching', action='store_true',
+                        help='enable outbound micro-batching of room broadcasts')
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--record', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=20.0,
+                        help='percent change in p95 or throughput counted as a regression')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary directory and server log')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ct-loadtest-')
+    server, base_url = start_server(workdir, free_port(), args)
+    print(f"app.py running at {base_url} (pid {server.pid}), workdir {workdir}")
+
+    try:
+        usernames = create_users(base_url, args.clients)
+        recorder = Recorder()
+        start, stop = threading.Event(), threading.Event()
+        rng = random.Random(args.seed)
+
+        threads = [
+            threading.Thread(target=run_client, daemon=True, args=(
+                base_url, username, CHANNELS[n % len(CHANNELS)], args, recorder,
+                start, stop, random.Random(rng.random())
+            ))
+            for n, username in enumerate(usernames)
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        start.set()
+        time.sleep(args.duration)
+        stop.set()
+        elapsed = time.perf_counter() - started
+        for thread in threads:
+            thread.join(timeout=30)
+
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = recorder.summary(elapsed)
+    print(f"\n{args.clients} clients, {elapsed:.1f}s, think time {args.think_time}s")
+    print(f"{'event':18} {'count':>8} {'errors':>7} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for event, stats in summary.items():
+        print(f"{event:18} {stats['count']:8} {stats['errors']:7} {stats['throughput']:9.1f}"
+              f" {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}")
+
+    if args.record:
+        with open(args.record, 'w') as f:
+            json.dump({
+                'config': {
+                    'clients': args.clients,
+                    'duration': args.duration,
+                    'think_time': args.think_time,
+                    'bcrypt_rounds': args.bcrypt_rounds,
+                    'rate_limit': args.rate_limit,
+                    'batching': args.batching
+                },
+                'events': summary
+            }, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write('\n')
+        print(f"\nbaseline written to {args.record}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline['events'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold}%")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""Message insert cost of the FTS5 search index and search latency against LIKE.
+
+Run from the backend directory:
+
+    python -m benchmarks.search_bench --rows 1000000 --inserts 5000
+
+Two fresh temporary databases are seeded with the same synthetic corpus, one
+with the message_fts index and triggers and one without. Single-row inserts
+are timed one commit at a time (like handle_websocket_message), then a set of
+queries is timed through search_messages and through a LIKE '%term%' scan.
+"""
+from flask import Flask
+from datetime import datetime, timedelta
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.misc import db, Message
+from src.storage import configure_storage
+from src.search import ensure_search_index, build_match_query, search_messages
+
+CHANNELS = ['general', 'random', 'tech', 'gaming']
+
+QUERIES = ['pizza', 'deploy', 'weekend plans', 'server down', 'lunch', 'release notes', 'rele*', 'zebra']
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    configure_storage(app)
+    db.init_app(app)
+    return app
+
+def make_vocabulary(size, rng):
+    words = ['pizza', 'deploy', 'weekend', 'plans', 'server', 'down', 'lunch', 'release', 'notes']
+    while len(words) < size:
+        words.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))))
+    return words
+
+def make_text(vocabulary, rng):
+    return ' '.join(vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+                    for _ in range(rng.randint(4, 20)))
+
+def seed(app, args, indexed):
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    started = datetime.utcnow() - timedelta(seconds=args.rows)
+
+    with app.app_context():
+        db.create_all()
+        for offset in range(0, args.rows, 10000):
+            db.session.execute(Message.__table__.insert(), [{
+                'channel_id': CHANNELS[i % len(CHANNELS)],
+                'user_id': i % 500,
+                'username': f'user{i % 500}',
+                'text': make_text(vocabulary, rng),
+                'timestamp': started + timedelta(seconds=i),
+                'is_read': False,
+                'reactions': '{}'
+            } for i in range(offset, min(offset + 10000, args.rows))])
+            db.session.commit()
+        if indexed:
+            ensure_search_index()
+
+    return vocabulary, rng
+
+def time_inserts(app, args, vocabulary, rng):
+    latencies = []
+    with app.app_context():
+        for i in range(args.inserts):
+            started = time.perf_counter()
+            db.session.add(Message(channel_id=CHANNELS[i % len(CHANNELS)], user_id=i % 500,
+                                   username=f'user{i % 500}', text=make_text(vocabulary, rng)))
+            db.session.commit()
+            latencies.append(time.perf_counter() - started)
+        db.session.remove()
+    return latencies
+
+def time_queries(app, args, search):
+    latencies = {}
+    with app.app_context():
+        for query in QUERIES:
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                search(query)
+                samples.append(time.perf_counter() - started)
+            latencies[query] = samples
+        db.session.remove()
+    return latencies
+
+def fts_search(query):
+    search_messages(build_match_query(query), limit=20)
+
+def fts_recent_search(query):
+    search_messages(build_match_query(query), sort='recent', limit=20)
+
+def like_search(query):
+    rows = Message.query
+    for term in query.split():
+        rows = rows.filter(Message.text.like(f"%{term.rstrip('*')}%"))
+    rows.order_by(Message.id.desc()).limit(20).all()
+
+def report_latencies(name, samples):
+    print(f"  {name:24} {len(samples):6} ops"
+          f"  p50 {percentile(samples, 50) * 1000:8.3f} ms"
+          f"  p95 {percentile(samples, 95) * 1000:8.3f} ms"
+          f"  p99 {percentile(samples, 99) * 1000:8.3f} ms")
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='ct-search-')
+    results = {}
+
+    for indexed in (False, True):
+        app = make_app(os.path.join(workdir, f'bench-{int(indexed)}.db'))
+        started = time.perf_counter()
+        vocabulary, rng = seed(app, args, indexed)
+        seeded = time.perf_counter() - started
+        inserts = time_inserts(app, args, vocabulary, rng)
+
+        results[indexed] = inserts
+        print(f"\n[{'with' if indexed else 'without'} search index]  seeded {args.rows} rows in {seeded:.1f}s"
+              f"  db size {os.path.getsize(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]) / 2**20:.1f} MiB")
+        report_latencies('insert + commit', inserts)
+
+        if indexed:
+            for name, search in (('fts relevance', fts_search), ('fts recent', fts_recent_search)):
+                for query, samples in time_queries(app, args, search).items():
+                    report_latencies(f'{name} "{query}"', samples)
+        else:
+            for query, samples in time_queries(app, args, like_search).items():
+                report_latencies(f'like "{query}"', samples)
+
+        with app.app_context():
+            db.engine.dispose()
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    before, after = percentile(results[False], 50), percentile(results[True], 50)
+    print(f"\ninsert p50 overhead of the search index: {(after - before) * 1000:+.3f} ms"
+          f" ({(after / before - 1) * 100 if before else 0:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--inserts', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--vocabulary', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    run(args)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Read/write concurrency on SQLite with and without the tuned storage profile.
+
+Run from the backend directory:
+
+    python -m benchmarks.storage_bench --writers 4 --readers 8 --duration 10
+
+Each profile gets a fresh temporary database. Writer threads insert chat
+messages one commit at a time (like handle_websocket_message) while reader
+threads fetch the newest history page of a channel (like get_chat_messages).
+"""
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.misc import db, Message
+from src.storage import configure_storage
+
+CHANNELS = ['general', 'random', 'tech', 'gaming']
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLITE_TUNING'] = tuned
+    configure_storage(app)
+    db.init_app(app)
+    return app
+
+def seed(app, rows):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Message.__table__.insert(), [{
+            'channel_id': CHANNELS[i % len(CHANNELS)],
+            'user_id': i % 50,
+            'username': f'user{i % 50}',
+            'text': f'seed message {i}',
+            'timestamp': datetime.utcnow(),
+            'is_read': False,
+            'reactions': '{}'
+        } for i in range(rows)])
+        db.session.commit()
+
+def run_profile(name, tuned, args):
+    workdir = tempfile.mkdtemp(prefix='ct-storage-')
+    app = make_app(os.path.join(workdir, 'bench.db'), tuned)
+    seed(app, args.seed_rows)
+
+    stop = threading.Event()
+    results = {'write': [], 'read': [], 'write_errors': 0, 'read_errors': 0}
+    lock = threading.Lock()
+
+    def writer(n):
+        latencies, errors = [], 0
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.session.add(Message(channel_id=CHANNELS[n % len(CHANNELS)], user_id=n,
+                                           username=f'writer{n}', text='benchmark message'))
+                    db.session.commit()
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    db.session.rollback()
+                    errors += 1
+            db.session.remove()
+        with lock:
+            results['write'].extend(latencies)
+            results['write_errors'] += errors
+
+    def reader(n):
+        latencies, errors = [], 0
+        with app.app_context():
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    Message.query.filter_by(channel_id=CHANNELS[n % len(CHANNELS)]) \
+                        .order_by(Message.timestamp.desc(), Message.id.desc()) \
+                        .limit(50).all()
+                    db.session.commit()
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    db.session.rollback()
+                    errors += 1
+            db.session.remove()
+        with lock:
+            results['read'].extend(latencies)
+            results['read_errors'] += errors
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n[{name}]")
+    for kind in ('write', 'read'):
+        samples = results[kind]
+        print(f"  {kind:5}  {len(samples) / args.duration:9.1f} ops/s"
+              f"  p50 {percentile(samples, 50) * 1000:7.2f} ms"
+              f"  p95 {percentile(samples, 95) * 1000:7.2f} ms"
+              f"  p99 {percentile(samples, 99) * 1000:7.2f} ms"
+              f"  errors {results[kind + '_errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--seed-rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.duration}s per profile, "
+          f"{args.seed_rows} seeded rows")
+    run_profile('before: default journaling', False, args)
+    run_profile('after: WAL + tuned pragmas', True, args)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
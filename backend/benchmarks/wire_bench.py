@@ -0,0 +1,105 @@
+"""CPU time and bytes on the wire per broadcast for each wire format.
+
+Run from the backend directory:
+
+    python -m benchmarks.wire_bench --iterations 20000 --room-sizes 10,100,1000
+
+For every representative event payload the Socket.IO and Engine.IO packets
+are built exactly as a room broadcast builds them: encoded once with the
+stdlib json module (the previous default), once with the orjson-backed
+WireJSON, and once as a compact-key MessagePack binary attachment. The
+"per recipient" column shows what the same broadcast would cost if it were
+encoded separately for every member of the room.
+"""
+from datetime import datetime
+from engineio import packet as eio_packet
+from socketio import packet
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.wire import WireJSON, pack, msgpack, orjson
+
+class StdlibPacket(packet.Packet):
+    json = json
+
+class WirePacket(packet.Packet):
+    json = WireJSON
+
+def sample_events():
+    now = datetime.utcnow().isoformat()
+    reactions = {
+        emoji: [{'user_id': str(n), 'username': f'user{n}'} for n in range(count)]
+        for emoji, count in (('👍', 4), ('🎉', 2), ('😂', 1))
+    }
+    return {
+        'message': {
+            'id': 123456, 'channel_id': 'general', 'user_id': '42', 'user': 'alice',
+            'text': 'Deploy is done, release notes are in the tech channel.',
+            'timestamp': now, 'reactions': {}, 'reaction_counts': {}
+        },
+        'reaction_update': {
+            'message_id': 123456, 'reactions': reactions,
+            'reaction_counts': {emoji: len(users) for emoji, users in reactions.items()}
+        },
+        'typing_update': {'channel_id': 'general', 'typing_users': ['alice', 'bobby', 'carol']},
+        'presence_delta': {
+            'updated': {str(n): {'username': f'user{n}', 'status': 'online', 'last_seen': now} for n in range(50)},
+            'removed': ['7', '9']
+        }
+    }
+
+def encode_json(packet_class, event, data):
+    encoded = packet_class(packet.EVENT, namespace='/', data=[event, data]).encode()
+    return [eio_packet.Packet(eio_packet.MESSAGE, encoded).encode()]
+
+def encode_msgpack(event, data):
+    encoded = WirePacket(packet.EVENT, namespace='/', data=[event, pack(data)]).encode()
+    return [eio_packet.Packet(eio_packet.MESSAGE, part).encode() for part in encoded]
+
+def wire_bytes(frames):
+    return sum(len(frame.encode('utf-8')) if isinstance(frame, str) else len(frame) for frame in frames)
+
+def measure(encode, iterations):
+    started = time.process_time()
+    for _ in range(iterations):
+        frames = encode()
+    return (time.process_time() - started) / iterations, wire_bytes(frames)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--room-sizes', default='10,100,1000')
+    args = parser.parse_args()
+    room_sizes = [int(size) for size in args.room_sizes.split(',')]
+
+    formats = [('stdlib json', lambda event, data: encode_json(StdlibPacket, event, data))]
+    if orjson is not None:
+        formats.append(('orjson', lambda event, data: encode_json(WirePacket, event, data)))
+    if msgpack is not None:
+        formats.append(('msgpack compact', encode_msgpack))
+
+    print(f"{args.iterations} iterations per format, CPU time from time.process_time()")
+    if orjson is None or msgpack is None:
+        print("(orjson and/or msgpack are not installed; missing formats are skipped)")
+
+    for event, data in sample_events().items():
+        print(f"\n[{event}]")
+        baseline = None
+        for name, encode in formats:
+            cpu, size = measure(lambda: encode(event, data), args.iterations)
+            baseline = baseline or (cpu, size)
+            per_room = '  '.join(
+                f"n={n}: {cpu * n * 1e3:.2f} ms if encoded per recipient, {size * n / 1024:.1f} KiB sent"
+                for n in room_sizes
+            )
+            print(f"  {name:16} {cpu * 1e6:8.2f} us/encode  {size:6} B/recipient"
+                  f"  ({(cpu / baseline[0] - 1) * 100:+6.1f}% cpu, {(size / baseline[1] - 1) * 100:+6.1f}% bytes)")
+            print(f"  {'':16} {per_room}")
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
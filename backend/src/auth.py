@@ -1,13 +1,16 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session
 from flask_socketio import emit, disconnect, join_room, leave_room
-from datetime import datetime
 from src.misc import User, socketio
+from src.wire import negotiate, wire_room
+from src.ratelimit import rate_limited, rate_limiter
+from src.membership import membership
 from src.utility import (
     extractRefreshToken, validateRefreshToken, createNewAccessToken,
     verifyAccessToken, displayUsers, checkCredentials, checkFormat,
     addUser, extractAccessTokenFromWebSocket, validateAccessToken,
     handle_websocket_message, handle_user_typing, handle_add_reaction,
-    handle_user_online, handle_user_disconnect
+    handle_user_online, handle_user_disconnect, handle_sync_request,
+    handle_channel_subscribe
 )
 
 auth = Blueprint('auth', __name__)
@@ -31,6 +34,16 @@ def signup():
 
     return addUser(username, password)
 
+@auth.route('/users/bulk', methods=['POST'])
+def bulk_signup():
+    from src.utility import login_required, bulk_add_users
+
+    @login_required
+    def _bulk_signup(user):
+        return bulk_add_users(user)
+
+    return _bulk_signup()
+
 @auth.route('/refresh', methods=['POST'])
 def refresh():
     refresh_token, error_response, status_code = extractRefreshToken()
@@ -65,68 +78,72 @@ def handle_connect(auth=None):
 
     session['user_id'] = user_data['user_id']
     session['username'] = user_data['username']
+    requested_wire = auth.get('wire') if isinstance(auth, dict) else None
+    session['wire'] = negotiate(requested_wire or request.args.get('wire'))
+    join_room(wire_room(None, session['wire']))
+    membership.connect(request.sid, user_data['user_id'], user_data['username'])
 
     emit('connection_response', {
         'message': 'Welcome to Cartesian Theater!',
         'session_id': request.sid,
         'user_id': user_data['user_id'],
         'username': user_data['username'],
-        'status': 'connected'
+        'status': 'connected',
+        'wire': session['wire']
     })
 
     return True
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    rate_limiter.forget(request.sid)
+    membership.disconnect(request.sid)
     handle_user_disconnect(session)
 
 @socketio.on('message')
+@rate_limited('message')
 def handle_message(data):
     handle_websocket_message(session, data)
 
 @socketio.on('typing')
+@rate_limited('typing')
 def handle_typing(data):
     handle_user_typing(session, data)
 
 @socketio.on('add_reaction')
+@rate_limited('add_reaction')
 def handle_reaction(data):
     handle_add_reaction(session, data)
 
 @socketio.on('user_online')
+@rate_limited('user_online')
 def handle_online():
     handle_user_online(session)
 
+@socketio.on('sync')
+@rate_limited('sync')
+def handle_sync(data):
+    return handle_sync_request(session, data)
+
+@socketio.on('subscribe')
+@rate_limited('subscribe')
+def handle_subscribe(data):
+    return handle_channel_subscribe(session, data)
+
 @socketio.on('join_channel')
+@rate_limited('join_channel')
 def handle_join_channel(data):
     channel_id = data.get('channel_id')
-    username = session.get('username')
-    join_room(channel_id)
+    join_room(wire_room(channel_id, session.get('wire')))
+    membership.join(request.sid, session.get('user_id'), session.get('username'), [channel_id])
     emit('joined_channel', {'channel_id': channel_id})
 
-    emit('message', {
-        'id': f'system-{request.sid}-{channel_id}',
-        'channel_id': channel_id,
-        'user': 'System',
-        'text': f'{username} has joined the channel',
-        'timestamp': datetime.utcnow().isoformat(),
-        'isSystem': True
-    }, room=channel_id, include_self=False)
-
 @socketio.on('leave_channel')
+@rate_limited('leave_channel')
 def handle_leave_channel(data):
     channel_id = data.get('channel_id')
-    username = session.get('username')
-
-    emit('message', {
-        'id': f'system-{request.sid}-{channel_id}-leave',
-        'channel_id': channel_id,
-        'user': 'System',
-        'text': f'{username} has left the channel',
-        'timestamp': datetime.utcnow().isoformat(),
-        'isSystem': True
-    }, room=channel_id, include_self=False)
-
-    leave_room(channel_id)
+    membership.leave(request.sid, [channel_id])
+    leave_room(wire_room(channel_id, session.get('wire')))
     emit('left_channel', {'channel_id': channel_id})
 
 @auth.route('/debug/users', methods=['GET'])
@@ -141,6 +158,32 @@ def list_users():
         "data": user_data
     }), 200
 
+@auth.route('/users', methods=['GET'])
+def user_directory():
+    from src.utility import login_required, get_user_directory
+
+    @login_required
+    def _user_directory(user):
+        return get_user_directory(user)
+
+    return _user_directory()
+
+@auth.route('/debug/stats', methods=['GET'])
+def debug_stats():
+    from src.utility import collectStats
+
+    return jsonify({
+        "message": "Stats retrieved successfully",
+        "success": True,
+        "data": collectStats()
+    }), 200
+
+@auth.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    from src.metrics import metrics
+
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @auth.route('/messages/<channel_id>', methods=['GET'])
 def get_messages(channel_id):
     from src.utility import login_required, get_chat_messages
@@ -149,4 +192,34 @@ def get_messages(channel_id):
     def _get_messages(user):
         return get_chat_messages(user, channel_id)
 
-    return _get_messages()
\ No newline at end of file
+    return _get_messages()
+
+@auth.route('/sync', methods=['POST'])
+def sync():
+    from src.utility import login_required, sync_messages
+
+    @login_required
+    def _sync(user):
+        return sync_messages(user)
+
+    return _sync()
+
+@auth.route('/unread', methods=['GET'])
+def get_unread():
+    from src.utility import login_required, get_unread_counts
+
+    @login_required
+    def _get_unread(user):
+        return get_unread_counts(user)
+
+    return _get_unread()
+
+@auth.route('/search', methods=['GET'])
+def search():
+    from src.utility import login_required, search_chat_messages
+
+    @login_required
+    def _search(user):
+        return search_chat_messages(user)
+
+    return _search()
\ No newline at end of file
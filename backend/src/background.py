@@ -0,0 +1,15 @@
+from src.misc import socketio
+import logging
+
+logger = logging.getLogger(__name__)
+
+def run_periodically(interval, task):
+    def loop():
+        while True:
+            socketio.sleep(interval)
+            try:
+                task()
+            except Exception:
+                logger.exception("Background task %s failed", task.__qualname__)
+
+    return socketio.start_background_task(loop)
\ No newline at end of file
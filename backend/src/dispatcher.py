@@ -0,0 +1,121 @@
+from src.background import run_periodically
+from src.wire import broadcaster
+import threading
+import time
+
+def skippedSids(skip_sid):
+    if skip_sid is None:
+        return set()
+    if isinstance(skip_sid, str):
+        return {skip_sid}
+    return set(skip_sid)
+
+class OutboundDispatcher:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.window = 0.01
+        self.max_events = 50
+        self.events = ('message', 'reaction_update')
+        self.stats = {
+            'events_batched': 0,
+            'frames_sent': 0,
+            'frames_saved': 0,
+            'direct_frames': 0,
+            'flushed_by_size': 0,
+            'flushed_by_time': 0,
+            'flushed_by_order': 0,
+            'added_latency_total_ms': 0.0,
+            'added_latency_max_ms': 0.0
+        }
+
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._started = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('BROADCAST_BATCHING', self.enabled)
+        self.window = app.config.get('BROADCAST_BATCH_WINDOW_MS', self.window * 1000) / 1000
+        self.max_events = app.config.get('BROADCAST_BATCH_MAX_EVENTS', self.max_events)
+        self.events = tuple(app.config.get('BROADCAST_BATCH_EVENTS', self.events))
+        broadcaster.dispatcher = self if self.enabled else None
+
+    def submit(self, event, data, room, skip_sid=None):
+        if event not in self.events:
+            with self._flush_lock:
+                if room in self._buffers:
+                    self._flush_room(room, 'flushed_by_order')
+                broadcaster.send(event, data, room, skip_sid)
+            return
+
+        with self._lock:
+            buffer = self._buffers.get(room)
+            if buffer is None:
+                buffer = self._buffers[room] = {'started': time.monotonic(), 'events': []}
+            buffer['events'].append((event, data, skip_sid, time.monotonic()))
+            full = len(buffer['events']) >= self.max_events
+
+            if not self._started:
+                self._started = True
+                run_periodically(self.window / 2, self.flush)
+
+        if full:
+            with self._flush_lock:
+                self._flush_room(room, 'flushed_by_size')
+
+    def flush(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [room for room, buffer in self._buffers.items() if now - buffer['started'] >= self.window]
+
+        with self._flush_lock:
+            for room in due:
+                self._flush_room(room, 'flushed_by_time')
+
+    def _flush_room(self, room, reason):
+        with self._lock:
+            buffer = self._buffers.pop(room, None)
+        if buffer is None:
+            return
+
+        events = buffer['events']
+        now = time.monotonic()
+        skips = [skippedSids(skip_sid) for event, data, skip_sid, queued_at in events]
+        skipped = set().union(*skips)
+
+        self._send([(event, data) for event, data, skip_sid, queued_at in events],
+                   lambda event, data: broadcaster.send(event, data, room, sorted(skipped) or None))
+        direct = 0
+        for sid in skipped:
+            visible = [(event, data) for (event, data, skip_sid, queued_at), skip in zip(events, skips) if sid not in skip]
+            direct += bool(self._send(visible, lambda event, data: broadcaster.send_to(sid, event, data, room)))
+
+        latencies = [(now - queued_at) * 1000 for event, data, skip_sid, queued_at in events]
+        with self._lock:
+            self.stats[reason] += 1
+            self.stats['events_batched'] += len(events)
+            self.stats['frames_sent'] += 1
+            self.stats['direct_frames'] += direct
+            self.stats['frames_saved'] += len(events) - 1
+            self.stats['added_latency_total_ms'] += sum(latencies)
+            self.stats['added_latency_max_ms'] = max(self.stats['added_latency_max_ms'], max(latencies))
+
+    def _send(self, events, send):
+        if len(events) == 1:
+            return send(*events[0])
+        if events:
+            return send('batch', {'events': [[event, data] for event, data in events]})
+        return False
+
+    def snapshot(self):
+        with self._lock:
+            batched = self.stats['events_batched']
+            return dict(self.stats,
+                        enabled=self.enabled,
+                        pending_rooms=len(self._buffers),
+                        avg_added_latency_ms=self.stats['added_latency_total_ms'] / batched if batched else 0.0)
+
+dispatcher = OutboundDispatcher()
\ No newline at end of file
@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+
+class PoolSaturated(Exception):
+    pass
+
+def hash_password(password, rounds):
+    salt = bcrypt.gensalt(rounds=rounds, prefix=b'2b')
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+def check_password(password_hash, password):
+    password_hash = password_hash.encode('utf-8')
+    return hmac.compare_digest(bcrypt.hashpw(password.encode('utf-8'), password_hash), password_hash)
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.pool_size = os.cpu_count() or 1
+        self.queue_size = self.pool_size * 4
+        self.bulk_pool_size = 1
+        self.bulk_concurrency = 1
+        self.stats = {
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'completed': 0,
+            'rejected': 0,
+            'bulk_in_flight': 0,
+            'bulk_completed': 0,
+            'bulk_rejected': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0
+        }
+
+        self._executor = None
+        self._bulk_executor = None
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_concurrency)
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.pool_size = app.config.get('BCRYPT_POOL_SIZE', self.pool_size)
+        self.queue_size = app.config.get('BCRYPT_QUEUE_SIZE', self.queue_size)
+        self.bulk_pool_size = app.config.get('BCRYPT_BULK_POOL_SIZE', self.bulk_pool_size)
+        self.bulk_concurrency = app.config.get('BCRYPT_BULK_CONCURRENCY', self.bulk_concurrency)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._bulk_slots = threading.BoundedSemaphore(self.bulk_concurrency)
+
+    def generate_password_hash(self, password):
+        return self._run(hash_password, password, self.rounds)
+
+    def check_password_hash(self, password_hash, password):
+        return self._run(check_password, password_hash, password)
+
+    def generate_password_hashes(self, passwords):
+        return self._run_many(hash_password, passwords, [self.rounds] * len(passwords))
+
+    def snapshot(self):
+        completed = self.stats['completed']
+        return dict(self.stats,
+                    avg_latency_ms=self.stats['latency_total_ms'] / completed if completed else 0.0,
+                    pool_size=self.pool_size,
+                    queue_size=self.queue_size,
+                    bulk_pool_size=self.bulk_pool_size)
+
+    def _executor_for_pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.pool_size,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _bulk_executor_for_pool(self):
+        if self._bulk_executor is None:
+            with self._lock:
+                if self._bulk_executor is None:
+                    self._bulk_executor = ProcessPoolExecutor(max_workers=self.bulk_pool_size,
+                                                              mp_context=multiprocessing.get_context('spawn'))
+        return self._bulk_executor
+
+    def _run(self, fn, *args):
+        def work():
+            if not self.pool_size:
+                return fn(*args)
+            return self._executor_for_pool().submit(fn, *args).result()
+
+        return self._admit(work)
+
+    def _run_many(self, fn, *iterables):
+        if not self._bulk_slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['bulk_rejected'] += 1
+            raise PoolSaturated()
+
+        with self._lock:
+            self.stats['bulk_in_flight'] += 1
+        try:
+            if not self.bulk_pool_size:
+                return list(map(fn, *iterables))
+            chunksize = max(1, len(iterables[0]) // (self.bulk_pool_size * 4))
+            return list(self._bulk_executor_for_pool().map(fn, *iterables, chunksize=chunksize))
+        finally:
+            self._bulk_slots.release()
+            with self._lock:
+                self.stats['bulk_in_flight'] -= 1
+                self.stats['bulk_completed'] += 1
+
+    def _admit(self, work):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise PoolSaturated()
+
+        with self._lock:
+            self.stats['queue_depth'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.stats['queue_depth'])
+
+        started = time.perf_counter()
+        try:
+            return work()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._slots.release()
+            with self._lock:
+                self.stats['queue_depth'] -= 1
+                self.stats['completed'] += 1
+                self.stats['latency_total_ms'] += elapsed_ms
+                self.stats['latency_max_ms'] = max(self.stats['latency_max_ms'], elapsed_ms)
+
+password_hasher = PasswordHasher()
\ No newline at end of file
@@ -0,0 +1,149 @@
+from collections import OrderedDict, deque
+import json
+import threading
+
+class HistoryCache:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.depth = 200
+        self.max_bytes = 32 * 1024 * 1024
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'appends': 0,
+            'evictions': 0,
+            'stale_fills': 0
+        }
+
+        self._channels = OrderedDict()
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('HISTORY_CACHE_ENABLED', self.enabled) and not app.config.get('MESSAGE_QUEUE')
+        self.depth = app.config.get('HISTORY_CACHE_DEPTH', self.depth)
+        self.max_bytes = app.config.get('HISTORY_CACHE_MAX_BYTES', self.max_bytes)
+
+    def page(self, channel_id, limit):
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._channels.get(channel_id)
+            if entry is None or (len(entry['messages']) < limit and not entry['complete']):
+                self.stats['misses'] += 1
+                return None
+
+            self._channels.move_to_end(channel_id)
+            self.stats['hits'] += 1
+            messages = list(entry['messages'])[-limit:]
+            has_more = len(entry['messages']) > limit or not entry['complete']
+            return messages, has_more
+
+    def generation(self, channel_id):
+        with self._lock:
+            return self._generations.get(channel_id, 0)
+
+    def store(self, channel_id, messages, complete, generation=None):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(channel_id, 0):
+                self.stats['stale_fills'] += 1
+                return
+
+            self._drop(channel_id)
+            entry = {
+                'messages': deque(maxlen=self.depth),
+                'sizes': deque(maxlen=self.depth),
+                'complete': complete
+            }
+            self._channels[channel_id] = entry
+            for message in messages[-self.depth:]:
+                self._push(entry, message)
+            if len(messages) > self.depth:
+                entry['complete'] = False
+            self._enforce_budget()
+
+    def append(self, channel_id, message):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._bump(channel_id)
+            entry = self._channels.get(channel_id)
+            if entry is None:
+                return
+
+            self._push(entry, message)
+            self.stats['appends'] += 1
+            self._enforce_budget()
+
+    def update_reactions(self, channel_id, message_id, reactions, reaction_counts):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._bump(channel_id)
+            entry = self._channels.get(channel_id)
+            if entry is None:
+                return
+
+            for index, message in enumerate(entry['messages']):
+                if message['id'] == message_id:
+                    entry['messages'][index] = dict(message, reactions=reactions, reaction_counts=reaction_counts)
+                    return
+
+    def invalidate(self, channel_id):
+        with self._lock:
+            self._bump(channel_id)
+            self._drop(channel_id)
+
+    def snapshot(self):
+        return dict(self.stats, channels=len(self._channels), bytes=self._bytes, enabled=self.enabled)
+
+    def _push(self, entry, message):
+        messages, sizes = entry['messages'], entry['sizes']
+        size = len(json.dumps(message))
+
+        if len(messages) == messages.maxlen:
+            self._bytes -= sizes[0]
+            entry['complete'] = False
+
+        key = (message['timestamp'], message['id'])
+        if messages and key < (messages[-1]['timestamp'], messages[-1]['id']):
+            position = len(messages)
+            while position > 0 and key < (messages[position - 1]['timestamp'], messages[position - 1]['id']):
+                position -= 1
+            if len(messages) == messages.maxlen:
+                messages.popleft()
+                sizes.popleft()
+                position -= 1
+            messages.insert(max(position, 0), message)
+            sizes.insert(max(position, 0), size)
+        else:
+            messages.append(message)
+            sizes.append(size)
+
+        self._bytes += size
+
+    def _bump(self, channel_id):
+        self._generations[channel_id] = self._generations.get(channel_id, 0) + 1
+
+    def _drop(self, channel_id):
+        entry = self._channels.pop(channel_id, None)
+        if entry is not None:
+            self._bytes -= sum(entry['sizes'])
+
+    def _enforce_budget(self):
+        while self._bytes > self.max_bytes and self._channels:
+            channel_id = next(iter(self._channels))
+            self._drop(channel_id)
+            self.stats['evictions'] += 1
+
+history_cache = HistoryCache()
\ No newline at end of file
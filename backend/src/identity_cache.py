@@ -0,0 +1,103 @@
+from src.misc import db, User
+from sqlalchemy import event
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+UserIdentity = namedtuple('UserIdentity', ['id', 'username'])
+
+class IdentityCache:
+    def __init__(self, app=None):
+        self.max_size = 10000
+        self.ttl = 60
+        self.stats = {
+            'user_hits': 0,
+            'user_misses': 0,
+            'token_hits': 0,
+            'token_misses': 0,
+            'invalidations': 0
+        }
+
+        self._users = OrderedDict()
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config.get('IDENTITY_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', self.ttl)
+
+    def get_user(self, user_id):
+        user_id = int(user_id)
+        cached = self._get(self._users, user_id)
+        if cached is not None:
+            self.stats['user_hits'] += 1
+            return cached
+
+        self.stats['user_misses'] += 1
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+
+        identity = UserIdentity(user.id, user.username)
+        self._put(self._users, user_id, identity, time.time() + self.ttl)
+        return identity
+
+    def get_token(self, token):
+        cached = self._get(self._tokens, token)
+        if cached is not None:
+            self.stats['token_hits'] += 1
+        else:
+            self.stats['token_misses'] += 1
+        return cached
+
+    def put_token(self, token, user_id, exp=None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        self._put(self._tokens, token, user_id, expires_at)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(int(user_id), None)
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._tokens.clear()
+
+    def snapshot(self):
+        return dict(self.stats, users=len(self._users), tokens=len(self._tokens))
+
+    def _get(self, entries, key):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del entries[key]
+                return None
+
+            entries.move_to_end(key)
+            return value
+
+    def _put(self, entries, key, value, expires_at):
+        with self._lock:
+            entries[key] = (value, expires_at)
+            entries.move_to_end(key)
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+
+identity_cache = IdentityCache()
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_user(mapper, connection, target):
+    if target.id is not None:
+        identity_cache.invalidate(target.id)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import json
+import os
+import random
+import re
+import threading
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json')
+
+WORD_PATTERN = re.compile(r"\w+")
+WORD_BYTES = frozenset(b'0123456789_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SEPARATORS = bytes(byte if byte in WORD_BYTES else ord(' ') for byte in range(128)) + bytes(range(128, 256))
+
+def tokenize(text):
+    text = text.lower()
+    if text.isascii():
+        return text.encode('ascii').translate(SEPARATORS).split()
+    return [word.encode('utf-8') for word in WORD_PATTERN.findall(text)]
+
+def indexKeywords(keywords):
+    index = {}
+    for words, (rank, intent) in keywords.items():
+        index.setdefault(words[0], []).append((words, rank, intent))
+    return index
+
+class IntentMatcher:
+    def __init__(self, app=None):
+        self.path = INTENTS_FILE
+        self.responses = {}
+        self.fallback = []
+        self.keywords = {}
+        self.index = {}
+        self.first_words = frozenset()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = app.config.get('AI_INTENTS_FILE', self.path)
+        self._loaded = False
+
+    def load(self, path=None):
+        with open(path or self.path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        intents = data.get('intents', [])
+        keywords = {}
+        for rank, intent in enumerate(intents):
+            for keyword in intent['keywords']:
+                words = tuple(tokenize(keyword))
+                if not words:
+                    raise ValueError(f"Keyword {keyword!r} of intent {intent['name']!r} has no words")
+                keywords.setdefault(words, (rank, intent['name']))
+
+        index = indexKeywords(keywords)
+        with self._lock:
+            self.responses = {intent['name']: list(intent['responses']) for intent in intents}
+            self.fallback = list(data.get('fallback', []))
+            self.keywords = keywords
+            self.index = index
+            self.first_words = frozenset(index)
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def match(self, text):
+        self._ensure_loaded()
+        if not text:
+            return None
+
+        words = tokenize(text)
+        if self.first_words.isdisjoint(words):
+            return None
+
+        best = None
+        for position, word in enumerate(words):
+            for keyword, rank, intent in self.index.get(word, ()):
+                if (best is None or rank < best[0]) and tuple(words[position:position + len(keyword)]) == keyword:
+                    if rank == 0:
+                        return intent
+                    best = (rank, intent)
+        return best[1] if best else None
+
+    def respond(self, text):
+        intent = self.match(text)
+        responses = self.responses.get(intent) if intent else None
+        return random.choice(responses or self.fallback)
+
+intent_matcher = IntentMatcher()
\ No newline at end of file
@@ -0,0 +1,197 @@
+from src.background import run_periodically
+from src.wire import broadcast
+from datetime import datetime
+import itertools
+import threading
+import time
+
+def describeUsers(usernames):
+    if len(usernames) == 1:
+        return usernames[0]
+    if len(usernames) <= 3:
+        return ', '.join(usernames[:-1]) + ' and ' + usernames[-1]
+    return f"{', '.join(usernames[:2])} and {len(usernames) - 2} others"
+
+def describeChange(usernames, action):
+    verb = 'has' if len(usernames) == 1 else 'have'
+    return f'{describeUsers(usernames)} {verb} {action} the channel'
+
+class MembershipIndex:
+    def __init__(self, app=None):
+        self.notice_window = 2.0
+        self.tick = 0.25
+        self.max_subscribe = 50
+        self.stats = {
+            'joins': 0,
+            'leaves': 0,
+            'notices_emitted': 0,
+            'notices_collapsed': 0
+        }
+
+        self._sid_user = {}
+        self._sid_channels = {}
+        self._user_sids = {}
+        self._user_channels = {}
+        self._channel_members = {}
+        self._pending = {}
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self._started = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.notice_window = app.config.get('MEMBERSHIP_NOTICE_WINDOW', self.notice_window)
+        self.tick = app.config.get('MEMBERSHIP_NOTICE_TICK', self.tick)
+        self.max_subscribe = app.config.get('MEMBERSHIP_MAX_SUBSCRIBE', self.max_subscribe)
+
+    def is_member(self, user_id, channel_id):
+        return user_id in self._channel_members.get(channel_id, ())
+
+    def is_connected(self, user_id):
+        return user_id in self._user_sids
+
+    def member_count(self, channel_id):
+        return len(self._channel_members.get(channel_id, ()))
+
+    def members(self, channel_id):
+        with self._lock:
+            return dict(self._channel_members.get(channel_id, {}))
+
+    def channels_of(self, user_id):
+        with self._lock:
+            return list(self._user_channels.get(user_id, ()))
+
+    def sid_channels(self, sid):
+        with self._lock:
+            return list(self._sid_channels.get(sid, ()))
+
+    def _register(self, sid, user_id, username):
+        self._sid_user[sid] = (user_id, username)
+        self._user_sids.setdefault(user_id, set()).add(sid)
+        return self._sid_channels.setdefault(sid, set())
+
+    def connect(self, sid, user_id, username):
+        with self._lock:
+            self._register(sid, user_id, username)
+
+    def join(self, sid, user_id, username, channels):
+        joined = []
+        with self._lock:
+            sid_channels = self._register(sid, user_id, username)
+            user_channels = self._user_channels.setdefault(user_id, {})
+
+            for channel_id in channels:
+                if channel_id in sid_channels:
+                    continue
+                sid_channels.add(channel_id)
+                user_channels[channel_id] = user_channels.get(channel_id, 0) + 1
+                if user_channels[channel_id] == 1:
+                    self._channel_members.setdefault(channel_id, {})[user_id] = username
+                    self._queue(channel_id, 'joined', user_id, username, sid)
+                    self.stats['joins'] += 1
+                    joined.append(channel_id)
+        return joined
+
+    def leave(self, sid, channels):
+        left = []
+        with self._lock:
+            user = self._sid_user.get(sid)
+            if user is None:
+                return left
+            user_id, username = user
+            sid_channels = self._sid_channels.get(sid, set())
+            user_channels = self._user_channels.get(user_id, {})
+
+            for channel_id in channels:
+                if channel_id not in sid_channels:
+                    continue
+                sid_channels.discard(channel_id)
+                user_channels[channel_id] -= 1
+                if user_channels[channel_id] == 0:
+                    del user_channels[channel_id]
+                    members = self._channel_members[channel_id]
+                    del members[user_id]
+                    if not members:
+                        del self._channel_members[channel_id]
+                    self._queue(channel_id, 'left', user_id, username, None)
+                    self.stats['leaves'] += 1
+                    left.append(channel_id)
+        return left
+
+    def disconnect(self, sid):
+        left = self.leave(sid, self.sid_channels(sid))
+        with self._lock:
+            user = self._sid_user.pop(sid, None)
+            self._sid_channels.pop(sid, None)
+            if user is not None:
+                user_id = user[0]
+                sids = self._user_sids.get(user_id, set())
+                sids.discard(sid)
+                if not sids:
+                    self._user_sids.pop(user_id, None)
+                    self._user_channels.pop(user_id, None)
+        return left
+
+    def _queue(self, channel_id, change, user_id, username, sid):
+        entry = self._pending.get(channel_id)
+        if entry is None:
+            entry = self._pending[channel_id] = {
+                'deadline': time.monotonic() + self.notice_window,
+                'joined': {},
+                'left': {},
+                'sids': {}
+            }
+
+        opposite = entry['left' if change == 'joined' else 'joined']
+        if user_id in opposite:
+            del opposite[user_id]
+            entry['sids'].pop(user_id, None)
+            self.stats['notices_collapsed'] += 1
+        else:
+            entry[change][user_id] = username
+            if sid is not None:
+                entry['sids'].setdefault(user_id, set()).add(sid)
+
+        if not self._started:
+            self._started = True
+            run_periodically(self.tick, self.flush)
+
+    def flush(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [channel_id for channel_id, entry in self._pending.items() if entry['deadline'] <= now]
+            batches = [(channel_id, self._pending.pop(channel_id)) for channel_id in due]
+
+        for channel_id, entry in batches:
+            changes = [
+                describeChange(list(entry[change].values()), change)
+                for change in ('joined', 'left') if entry[change]
+            ]
+            if not changes:
+                continue
+
+            skip_sid = None
+            if len(entry['joined']) == 1 and not entry['left']:
+                skip_sid = list(entry['sids'].get(next(iter(entry['joined'])), ())) or None
+
+            broadcast('message', {
+                'id': f'system-{channel_id}-{next(self._sequence)}',
+                'channel_id': channel_id,
+                'user': 'System',
+                'text': '; '.join(changes),
+                'timestamp': datetime.utcnow().isoformat(),
+                'isSystem': True
+            }, room=channel_id, skip_sid=skip_sid)
+            self.stats['notices_emitted'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats,
+                        connections=len(self._sid_user),
+                        users=len(self._user_sids),
+                        channels=len(self._channel_members),
+                        pending_notices=len(self._pending))
+
+membership = MembershipIndex()
\ No newline at end of file
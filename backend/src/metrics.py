@@ -0,0 +1,245 @@
+from src.misc import socketio
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+sql_scope = ContextVar('sql_scope', default=None)
+
+def escapeLabel(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def formatLabels(names, values, extra=''):
+    pairs = [f'{name}="{escapeLabel(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def formatValue(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            series = {labels: ([*counts], total, count) for labels, (counts, total, count) in self._series.items()}
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = formatLabels(self.labels, label_values, 'le="%s"' % bound)
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            bucket_labels = formatLabels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{bucket_labels} {count}')
+            lines.append(f'{self.name}_sum{formatLabels(self.labels, label_values)} {formatValue(total)}')
+            lines.append(f'{self.name}_count{formatLabels(self.labels, label_values)} {count}')
+        return lines
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{formatLabels(self.labels, label_values)} {formatValue(value)}')
+        return lines
+
+class Metrics:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.prefix = 'cartesian'
+        self.collectors = []
+        self._instrumented = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', self.enabled)
+        self.prefix = app.config.get('METRICS_PREFIX', self.prefix)
+        if not self.enabled or self._instrumented:
+            return
+        self._instrumented = True
+
+        prefix = self.prefix
+        self.http_duration = Histogram(f'{prefix}_http_request_duration_seconds',
+                                       'Latency of HTTP requests by endpoint', ('endpoint', 'method', 'status'))
+        self.event_duration = Histogram(f'{prefix}_socketio_event_duration_seconds',
+                                        'Latency of Socket.IO event handlers', ('event',))
+        self.event_errors = Counter(f'{prefix}_socketio_event_errors_total',
+                                    'Socket.IO event handlers that raised', ('event',))
+        self.sql_per_call = Histogram(f'{prefix}_sql_statements_per_call',
+                                      'SQL statements issued by one request or event', ('handler',), COUNT_BUCKETS)
+        self.sql_statements = Counter(f'{prefix}_sql_statements_total',
+                                      'SQL statements executed by handler', ('handler',))
+        self.sql_seconds = Counter(f'{prefix}_sql_seconds_total',
+                                   'Time spent executing SQL by handler', ('handler',))
+        self.sql_errors = Counter(f'{prefix}_sql_errors_total',
+                                  'SQL statements that raised by handler', ('handler',))
+        self.emits = Counter(f'{prefix}_socketio_emits_total', 'Socket.IO emits by event', ('event',))
+        self.collectors = [self.http_duration, self.event_duration, self.event_errors,
+                           self.sql_per_call, self.sql_statements, self.sql_seconds, self.sql_errors, self.emits]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        self._instrument_socketio()
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql_token = sql_scope.set([0, 0.0, 0])
+
+    def _after_request(self, response):
+        started = g.pop('metrics_started', None)
+        token = g.pop('metrics_sql_token', None)
+        if started is None:
+            return response
+
+        handler = request.endpoint or 'unmatched'
+        self.http_duration.observe(time.perf_counter() - started, handler, request.method, response.status_code)
+        self._record_sql(handler, sql_scope.get())
+        sql_scope.reset(token)
+        return response
+
+    def _record_sql(self, handler, scope):
+        if scope is None:
+            return
+        count, seconds, failed = scope
+        self.sql_per_call.observe(count, handler)
+        if count:
+            self.sql_statements.inc(count, handler)
+            self.sql_seconds.inc(seconds, handler)
+        if failed:
+            self.sql_errors.inc(failed, handler)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if sql_scope.get() is not None:
+            conn.info.setdefault('metrics_query_started', []).append((statement, time.perf_counter()))
+
+    def _finish_statement(self, conn, statement, failed):
+        pending = conn.info.get('metrics_query_started') if conn is not None else None
+        if not pending or pending[-1][0] != statement:
+            return
+        started = pending.pop()[1]
+        scope = sql_scope.get()
+        if scope is None:
+            return
+        scope[0] += 1
+        scope[1] += time.perf_counter() - started
+        scope[2] += failed
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._finish_statement(conn, statement, 0)
+
+    def _handle_error(self, exception_context):
+        self._finish_statement(exception_context.connection, exception_context.statement, 1)
+
+    def _instrument_socketio(self):
+        server = socketio.server
+        for namespace, handlers in server.handlers.items():
+            for name, handler in list(handlers.items()):
+                handlers[name] = self._wrap_event(name, handler)
+
+        emit = server.emit
+
+        @wraps(emit)
+        def counted_emit(event_name, *args, **kwargs):
+            self.emits.inc(1, event_name)
+            return emit(event_name, *args, **kwargs)
+
+        server.emit = counted_emit
+
+    def _wrap_event(self, name, handler):
+        @wraps(handler)
+        def timed_handler(*args, **kwargs):
+            token = sql_scope.set([0, 0.0, 0])
+            started = time.perf_counter()
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                self.event_errors.inc(1, name)
+                raise
+            finally:
+                self.event_duration.observe(time.perf_counter() - started, name)
+                self._record_sql(f'socketio:{name}', sql_scope.get())
+                sql_scope.reset(token)
+
+        return timed_handler
+
+    def _gauges(self):
+        rooms = socketio.server.manager.rooms.get('/', {})
+        clients = rooms.get(None, {})
+        lines = [
+            f'# HELP {self.prefix}_socketio_connected_clients Clients connected to this worker',
+            f'# TYPE {self.prefix}_socketio_connected_clients gauge',
+            f'{self.prefix}_socketio_connected_clients {len(clients)}',
+            f'# HELP {self.prefix}_socketio_room_members Members of each named room on this worker',
+            f'# TYPE {self.prefix}_socketio_room_members gauge'
+        ]
+        for room, members in sorted(rooms.items(), key=lambda item: str(item[0])):
+            if room is not None and room not in clients:
+                lines.append(f'{self.prefix}_socketio_room_members{formatLabels(("room",), (room,))} {len(members)}')
+        return lines
+
+    def _stats(self):
+        from src.utility import collectStats
+
+        lines = []
+        for subsystem, stats in sorted(collectStats().items()):
+            for key, value in sorted(stats.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f'{self.prefix}_{subsystem}_{key}'
+                lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name} {formatValue(value)}')
+        return lines
+
+    def render(self):
+        lines = []
+        for collector in self.collectors:
+            lines.extend(collector.render())
+        if self.enabled:
+            lines.extend(self._gauges())
+        lines.extend(self._stats())
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
\ No newline at end of file
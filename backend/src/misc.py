@@ -18,6 +18,12 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 class Message(db.Model):
+    __table_args__ = (
+        db.Index('ix_message_channel_timestamp_id', 'channel_id', 'timestamp', 'id'),
+        db.Index('ix_message_channel_id', 'channel_id', 'id'),
+        {'sqlite_autoincrement': True}
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     channel_id = db.Column(db.String(80), nullable=False)
     user_id = db.Column(db.Integer, nullable=False)
@@ -25,4 +31,24 @@ class Message(db.Model):
     text = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
-    reactions = db.Column(db.Text, default='{}')
\ No newline at end of file
+    reactions = db.Column(db.Text, default='{}')
+
+class Reaction(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('message_id', 'emoji', 'user_id', name='uq_reaction_message_emoji_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=False)
+    emoji = db.Column(db.String(32), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
+
+class ReadCursor(db.Model):
+    __table_args__ = (
+        db.Index('ix_read_cursor_channel_last_read', 'channel_id', 'last_read_id'),
+    )
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    channel_id = db.Column(db.String(80), primary_key=True)
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
\ No newline at end of file
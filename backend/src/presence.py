@@ -0,0 +1,87 @@
+from src.state import shared_state
+from src.background import run_periodically
+from src.wire import broadcast
+from datetime import datetime, timedelta
+import threading
+
+PRESENCE = 'presence'
+
+class PresenceTracker:
+    def __init__(self, app=None):
+        self.offline_ttl = 300
+        self.batch_window = 0.25
+        self.stats = {
+            'deltas_emitted': 0,
+            'changes_coalesced': 0,
+            'evicted': 0
+        }
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._last_eviction = datetime.utcnow()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.offline_ttl = app.config.get('PRESENCE_OFFLINE_TTL', self.offline_ttl)
+        self.batch_window = app.config.get('PRESENCE_BATCH_WINDOW', self.batch_window)
+
+    def snapshot(self):
+        return shared_state.items(PRESENCE)
+
+    def mark_online(self, user_id, username):
+        info = {
+            'username': username,
+            'status': 'online',
+            'last_seen': datetime.utcnow().isoformat()
+        }
+        shared_state.set(PRESENCE, user_id, info)
+        self._queue(user_id, info)
+
+    def mark_offline(self, user_id):
+        info = shared_state.get(PRESENCE, user_id)
+        if not info:
+            return
+
+        info['status'] = 'offline'
+        info['last_seen'] = datetime.utcnow().isoformat()
+        shared_state.set(PRESENCE, user_id, info)
+        self._queue(user_id, info)
+
+    def evict(self):
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.offline_ttl)).isoformat()
+        for user_id, info in shared_state.items(PRESENCE).items():
+            if info.get('status') == 'offline' and info.get('last_seen', '') < cutoff:
+                if shared_state.delete(PRESENCE, user_id):
+                    self.stats['evicted'] += 1
+                    self._queue(user_id, None)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if pending:
+            broadcast('presence_delta', {
+                'updated': {user_id: info for user_id, info in pending.items() if info is not None},
+                'removed': [user_id for user_id, info in pending.items() if info is None]
+            })
+            self.stats['deltas_emitted'] += 1
+
+        now = datetime.utcnow()
+        if (now - self._last_eviction).total_seconds() >= min(self.offline_ttl, 30):
+            self._last_eviction = now
+            self.evict()
+
+    def _queue(self, user_id, info):
+        with self._lock:
+            if user_id in self._pending:
+                self.stats['changes_coalesced'] += 1
+            self._pending[user_id] = info
+
+            if not self._started:
+                self._started = True
+                run_periodically(self.batch_window, self.flush)
+
+presence_tracker = PresenceTracker()
\ No newline at end of file
@@ -0,0 +1,155 @@
+from flask import request, session
+from functools import wraps
+import threading
+import time
+
+CRITICAL = 2
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.enabled = True
+        self.sid_limits = {}
+        self.user_limits = {}
+        self.priorities = {}
+        self.shed_in_flight = 64
+        self.shed_latency = 0.25
+        self.latency_alpha = 0.2
+        self.latency_half_life = 1.0
+        self.sweep_interval = 60.0
+        self.stats = {
+            'allowed': 0,
+            'shed_level': 0,
+            'in_flight': 0,
+            'latency_ewma_ms': 0.0
+        }
+
+        self._sid_buckets = {}
+        self._user_buckets = {}
+        self._latency = 0.0
+        self._latency_updated = time.monotonic()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', self.enabled)
+        self.sid_limits = dict(app.config.get('RATE_LIMITS_PER_SID', self.sid_limits))
+        self.user_limits = dict(app.config.get('RATE_LIMITS_PER_USER', self.user_limits))
+        self.priorities = dict(app.config.get('EVENT_PRIORITIES', self.priorities))
+        self.shed_in_flight = app.config.get('SHED_IN_FLIGHT', self.shed_in_flight)
+        self.shed_latency = app.config.get('SHED_LATENCY_MS', self.shed_latency * 1000) / 1000
+
+    def _take(self, buckets, event, limit, now):
+        rate, burst = limit
+        bucket = buckets.get(event)
+        if bucket is None:
+            bucket = buckets[event] = [float(burst), now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _sweep(self, now):
+        idle = [
+            user_id for user_id, buckets in self._user_buckets.items()
+            if all(now - updated > self.sweep_interval for tokens, updated in buckets.values())
+        ]
+        for user_id in idle:
+            del self._user_buckets[user_id]
+        self._last_sweep = now
+
+    def _current_latency(self, now):
+        return self._latency * 0.5 ** ((now - self._latency_updated) / self.latency_half_life)
+
+    def _shed_level(self, now):
+        pressure = max(self.stats['in_flight'] / self.shed_in_flight,
+                       self._current_latency(now) / self.shed_latency)
+        if pressure >= 2:
+            return 2
+        if pressure >= 1:
+            return 1
+        return 0
+
+    def _drop(self, reason, event):
+        key = f'{reason}_{event}'
+        self.stats[key] = self.stats.get(key, 0) + 1
+
+    def admit(self, event, sid, user_id):
+        now = time.monotonic()
+        priority = self.priorities.get(event, CRITICAL)
+
+        with self._lock:
+            if now - self._last_sweep > self.sweep_interval:
+                self._sweep(now)
+
+            level = self._shed_level(now)
+            self.stats['shed_level'] = level
+            if priority < level:
+                self._drop('shed', event)
+                return False
+
+            sid_limit = self.sid_limits.get(event)
+            if sid_limit and not self._take(self._sid_buckets.setdefault(sid, {}), event, sid_limit, now):
+                self._drop('limited_sid', event)
+                return False
+
+            user_limit = self.user_limits.get(event)
+            if user_limit and user_id and not self._take(self._user_buckets.setdefault(user_id, {}), event, user_limit, now):
+                self._drop('limited_user', event)
+                return False
+
+            self.stats['allowed'] += 1
+            self.stats['in_flight'] += 1
+        return True
+
+    def release(self, started):
+        now = time.monotonic()
+        with self._lock:
+            self.stats['in_flight'] -= 1
+            latency = self._current_latency(now)
+            self._latency = latency + self.latency_alpha * ((now - started) - latency)
+            self._latency_updated = now
+
+    def forget(self, sid):
+        with self._lock:
+            self._sid_buckets.pop(sid, None)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return dict(self.stats,
+                        shed_level=self._shed_level(now),
+                        latency_ewma_ms=self._current_latency(now) * 1000,
+                        connections=len(self._sid_buckets),
+                        users=len(self._user_buckets))
+
+rate_limiter = RateLimiter()
+
+def rate_limited(event):
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            if not rate_limiter.enabled:
+                return handler(*args, **kwargs)
+
+            if not rate_limiter.admit(event, request.sid, session.get('user_id')):
+                return {
+                    'message': 'Too many requests, slow down',
+                    'success': False,
+                    'error_type': 'rate_limited'
+                }
+
+            started = time.monotonic()
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                rate_limiter.release(started)
+
+        return wrapper
+    return decorator
\ No newline at end of file
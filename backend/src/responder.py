@@ -0,0 +1,148 @@
+from collections import OrderedDict, deque
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def resolveBackend(path):
+    module_name, _, attribute = path.partition(':')
+    if not attribute:
+        module_name, _, attribute = path.rpartition('.')
+    return getattr(importlib.import_module(module_name), attribute)
+
+class AIResponder:
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self.backend_path = 'src.utility:generate_ai_response'
+        self.channels = {}
+        self.workers = 4
+        self.queue_size = 100
+        self.channel_concurrency = 2
+        self.stats = {
+            'queued': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'queue_depth': 0,
+            'max_queue_depth': 0,
+            'in_flight': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0
+        }
+
+        self._pending = OrderedDict()
+        self._active = {}
+        self._ready = threading.Condition()
+        self._threads = []
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.backend_path = app.config.get('AI_RESPONDER', self.backend_path)
+        self.channels = dict(app.config.get('AI_RESPONDER_CHANNELS', self.channels))
+        self.workers = app.config.get('AI_RESPONDER_WORKERS', self.workers)
+        self.queue_size = app.config.get('AI_RESPONDER_QUEUE_SIZE', self.queue_size)
+        self.channel_concurrency = app.config.get('AI_RESPONDER_CHANNEL_CONCURRENCY', self.channel_concurrency)
+        self.backend = None
+
+    def handles(self, channel_id):
+        return channel_id in self.channels
+
+    def start(self):
+        with self._ready:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._run, name=f'ai-responder-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, channel_id, text):
+        if not self.handles(channel_id):
+            return False
+        if not self._threads:
+            self.start()
+
+        with self._ready:
+            if self.stats['queue_depth'] >= self.queue_size:
+                self.stats['rejected'] += 1
+                logger.warning("AI responder queue is full, dropping reply for %s", channel_id)
+                return False
+
+            self._pending.setdefault(channel_id, deque()).append((text, time.perf_counter()))
+            self.stats['queued'] += 1
+            self.stats['queue_depth'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.stats['queue_depth'])
+            self._ready.notify()
+        return True
+
+    def _next_job(self):
+        for channel_id, jobs in self._pending.items():
+            if self._active.get(channel_id, 0) < self.channel_concurrency:
+                text, queued_at = jobs.popleft()
+                if jobs:
+                    self._pending.move_to_end(channel_id)
+                else:
+                    del self._pending[channel_id]
+                return channel_id, text, queued_at
+        return None
+
+    def _run(self):
+        while True:
+            with self._ready:
+                job = self._next_job()
+                while job is None:
+                    self._ready.wait()
+                    job = self._next_job()
+
+                channel_id = job[0]
+                self._active[channel_id] = self._active.get(channel_id, 0) + 1
+                self.stats['queue_depth'] -= 1
+                self.stats['in_flight'] += 1
+
+            try:
+                self._respond(*job)
+            finally:
+                with self._ready:
+                    self._active[channel_id] -= 1
+                    self.stats['in_flight'] -= 1
+                    self._ready.notify()
+
+    def _respond(self, channel_id, text, queued_at):
+        from src.utility import postMessage
+
+        bot = self.channels[channel_id]
+        try:
+            with self.app.app_context():
+                if self.backend is None:
+                    self.backend = resolveBackend(self.backend_path)
+                reply = self.backend(text)
+                if reply:
+                    postMessage(channel_id, bot['user_id'], bot['username'], reply, extra={'isAI': True})
+        except Exception:
+            logger.exception("AI responder failed for %s", channel_id)
+            with self._ready:
+                self.stats['failed'] += 1
+            return
+
+        elapsed_ms = (time.perf_counter() - queued_at) * 1000
+        with self._ready:
+            self.stats['completed'] += 1
+            self.stats['latency_total_ms'] += elapsed_ms
+            self.stats['latency_max_ms'] = max(self.stats['latency_max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self._ready:
+            completed = self.stats['completed']
+            return dict(self.stats,
+                        avg_latency_ms=self.stats['latency_total_ms'] / completed if completed else 0.0,
+                        workers=len(self._threads))
+
+ai_responder = AIResponder()
\ No newline at end of file
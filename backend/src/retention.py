@@ -0,0 +1,324 @@
+from src.misc import db, Message, Reaction, socketio
+from src.background import run_periodically
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import fcntl
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+def messageKey(key):
+    timestamp, message_id = key
+    return datetime.fromisoformat(timestamp), message_id
+
+class RetentionManager:
+    def __init__(self, app=None):
+        self.app = None
+        self.archive_dir = 'archive'
+        self.default_days = None
+        self.policies = {}
+        self.batch_size = 500
+        self.segment_max_messages = 50000
+        self.interval = 3600
+        self.stats = {
+            'runs': 0,
+            'batches': 0,
+            'archived': 0,
+            'kept': 0,
+            'segments_written': 0,
+            'member_reads': 0,
+            'fallthrough_reads': 0
+        }
+
+        self._indexes = {}
+        self._members = OrderedDict()
+        self._lock = threading.Lock()
+        self._started = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.archive_dir = app.config.get('ARCHIVE_DIR', self.archive_dir)
+        self.default_days = app.config.get('RETENTION_DAYS', self.default_days)
+        self.policies = dict(app.config.get('RETENTION_POLICIES', self.policies))
+        self.batch_size = app.config.get('RETENTION_BATCH_SIZE', self.batch_size)
+        self.segment_max_messages = app.config.get('ARCHIVE_SEGMENT_MAX_MESSAGES', self.segment_max_messages)
+        self.interval = app.config.get('RETENTION_INTERVAL', self.interval)
+        self._indexes.clear()
+        self._members.clear()
+
+    def enabled(self):
+        return self.default_days is not None or any(days is not None for days in self.policies.values())
+
+    def start(self):
+        if self._started or self.app is None or not self.enabled():
+            return
+        self._started = True
+
+        def task():
+            with self.app.app_context():
+                self.compact()
+
+        run_periodically(self.interval, task)
+
+    def retention_days(self, channel_id):
+        return self.policies.get(channel_id, self.default_days)
+
+    def _channel_dir(self, channel_id):
+        if not re.fullmatch(r'[\w-][\w.-]*', channel_id or ''):
+            return None
+        return os.path.join(self.archive_dir, channel_id)
+
+    def _load_indexes(self, channel_id):
+        directory = self._channel_dir(channel_id)
+        if not directory or not os.path.isdir(directory):
+            return []
+
+        modified = os.stat(directory).st_mtime_ns
+        cached = self._indexes.get(channel_id)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        indexes = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.index.json'):
+                with open(os.path.join(directory, name)) as f:
+                    indexes.append(json.load(f))
+
+        self._indexes[channel_id] = (modified, indexes)
+        return indexes
+
+    def archived_max_id(self, channel_id):
+        with self._lock:
+            indexes = self._load_indexes(channel_id)
+            return indexes[-1]['last_id'] if indexes else 0
+
+    def max_archived_id(self):
+        if not os.path.isdir(self.archive_dir):
+            return 0
+        return max([self.archived_max_id(name) for name in os.listdir(self.archive_dir)
+                    if os.path.isdir(os.path.join(self.archive_dir, name))] or [0])
+
+    def archived_ids(self, channel_id, ids):
+        low, high = min(ids), max(ids)
+        found = set()
+        for index, member in self._members_for(channel_id):
+            if member['first_id'] <= high and member['last_id'] >= low:
+                found.update(message['id'] for message in self._read_member(channel_id, index, member))
+        return found & set(ids)
+
+    def compact(self, channels=None):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, '.compaction.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {}
+
+            if channels is None:
+                channels = [channel_id for (channel_id,) in db.session.query(Message.channel_id).distinct()]
+
+            archived = {}
+            for channel_id in channels:
+                days = self.retention_days(channel_id)
+                if days is None or self._channel_dir(channel_id) is None:
+                    continue
+                count = self.compact_channel(channel_id, datetime.utcnow() - timedelta(days=days))
+                if count:
+                    archived[channel_id] = count
+
+            self.stats['runs'] += 1
+            return archived
+
+    def compact_channel(self, channel_id, cutoff):
+        from src.utility import getReactions, serializeMessage
+        from src.history_cache import history_cache
+
+        archived_max_id = self.archived_max_id(channel_id)
+        after_id = None
+        total = 0
+        removed = 0
+
+        while True:
+            query = Message.query.filter(Message.channel_id == channel_id, Message.timestamp < cutoff)
+            if after_id is not None:
+                query = query.filter(Message.id > after_id)
+            rows = query.order_by(Message.id.asc()) \
+                .limit(self.batch_size).all()
+            if not rows:
+                break
+            after_id = rows[-1].id
+
+            fresh = [msg for msg in rows if msg.id > archived_max_id]
+            stale = [msg.id for msg in rows if msg.id <= archived_max_id]
+            kept = set(stale) - self.archived_ids(channel_id, stale) if stale else set()
+            if kept:
+                self.stats['kept'] += len(kept)
+                logger.error("Keeping %s messages in %s at or below archived id %s that are missing from the archive",
+                             len(kept), channel_id, archived_max_id)
+
+            if fresh:
+                reactions = getReactions([msg.id for msg in fresh])
+                self._append(channel_id, [serializeMessage(msg, reactions[msg.id]) for msg in fresh])
+                archived_max_id = fresh[-1].id
+
+            ids = [msg.id for msg in rows if msg.id not in kept]
+            if ids:
+                Reaction.query.filter(Reaction.message_id.in_(ids)).delete(synchronize_session=False)
+                Message.query.filter(Message.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+                removed += len(ids)
+
+            total += len(fresh)
+            self.stats['batches'] += 1
+            self.stats['archived'] += len(fresh)
+            socketio.sleep(0)
+
+        if removed:
+            history_cache.invalidate(channel_id)
+        if total:
+            logger.info("Archived %s messages from %s", total, channel_id)
+        return total
+
+    def _append(self, channel_id, messages):
+        directory = self._channel_dir(channel_id)
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            indexes = list(self._load_indexes(channel_id))
+            if not indexes or indexes[-1]['count'] >= self.segment_max_messages:
+                name = f"segment-{messages[0]['id']:012d}"
+                indexes.append({
+                    'segment': name + '.jsonl.gz',
+                    'first_id': messages[0]['id'],
+                    'last_id': messages[0]['id'],
+                    'count': 0,
+                    'size': 0,
+                    'members': []
+                })
+                self.stats['segments_written'] += 1
+            index = dict(indexes[-1], members=list(indexes[-1]['members']))
+
+            payload = gzip.compress(
+                ''.join(json.dumps(message, separators=(',', ':')) + '\n' for message in messages).encode('utf-8')
+            )
+            path = os.path.join(directory, index['segment'])
+            with open(path, 'ab') as f:
+                f.truncate(index['size'])
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+            keys = [(message['timestamp'], message['id']) for message in messages]
+            index['members'].append({
+                'first_id': messages[0]['id'],
+                'last_id': messages[-1]['id'],
+                'oldest': min(keys, key=messageKey),
+                'newest': max(keys, key=messageKey),
+                'offset': index['size'],
+                'length': len(payload)
+            })
+            index['last_id'] = messages[-1]['id']
+            index['count'] += len(messages)
+            index['size'] += len(payload)
+
+            index_path = os.path.join(directory, index['segment'].replace('.jsonl.gz', '.index.json'))
+            with open(index_path + '.tmp', 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(index_path + '.tmp', index_path)
+
+    def _read_member(self, channel_id, index, member):
+        key = (channel_id, index['segment'], member['offset'])
+        with self._lock:
+            messages = self._members.get(key)
+            if messages is not None:
+                self._members.move_to_end(key)
+                return messages
+
+        with open(os.path.join(self._channel_dir(channel_id), index['segment']), 'rb') as f:
+            f.seek(member['offset'])
+            data = gzip.decompress(f.read(member['length']))
+        messages = [json.loads(line) for line in data.splitlines()]
+
+        with self._lock:
+            self.stats['member_reads'] += 1
+            self._members[key] = messages
+            while len(self._members) > 16:
+                self._members.popitem(last=False)
+        return messages
+
+    def _members_for(self, channel_id):
+        with self._lock:
+            indexes = list(self._load_indexes(channel_id))
+        return [(index, member) for index in indexes for member in index['members']]
+
+    def read_before(self, channel_id, boundary, limit):
+        members = self._members_for(channel_id)
+        if not members or limit <= 0:
+            return []
+
+        self.stats['fallthrough_reads'] += 1
+        newest_so_far = []
+        for index, member in members:
+            newest = messageKey(member['newest'])
+            newest_so_far.append(max(newest, newest_so_far[-1]) if newest_so_far else newest)
+
+        results = []
+        for position in range(len(members) - 1, -1, -1):
+            if len(results) >= limit and newest_so_far[position] < results[limit - 1][0]:
+                break
+
+            index, member = members[position]
+            if boundary and messageKey(member['oldest']) >= boundary:
+                continue
+
+            for message in self._read_member(channel_id, index, member):
+                key = messageKey((message['timestamp'], message['id']))
+                if boundary is None or key < boundary:
+                    results.append((key, message))
+            results.sort(key=lambda item: item[0], reverse=True)
+
+        return [message for key, message in results[:limit]]
+
+    def read_after(self, channel_id, boundary, limit):
+        members = self._members_for(channel_id)
+        if not members or limit <= 0:
+            return []
+
+        self.stats['fallthrough_reads'] += 1
+        oldest_from = []
+        for index, member in reversed(members):
+            oldest = messageKey(member['oldest'])
+            oldest_from.append(min(oldest, oldest_from[-1]) if oldest_from else oldest)
+        oldest_from.reverse()
+
+        results = []
+        for position, (index, member) in enumerate(members):
+            if len(results) >= limit and oldest_from[position] > results[limit - 1][0]:
+                break
+
+            if messageKey(member['newest']) <= boundary:
+                continue
+
+            for message in self._read_member(channel_id, index, member):
+                key = messageKey((message['timestamp'], message['id']))
+                if key > boundary:
+                    results.append((key, message))
+            results.sort(key=lambda item: item[0])
+
+        return [message for key, message in results[:limit]]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, cached_members=len(self._members))
+
+retention_manager = RetentionManager()
\ No newline at end of file
@@ -0,0 +1,133 @@
+from socketio import PubSubManager
+import argparse
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def parse_local_url(url):
+    address = url[len('local://'):].rstrip('/')
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+class LocalSocketManager(PubSubManager):
+    name = 'local'
+
+    def __init__(self, url='local://127.0.0.1:5555', channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.address = parse_local_url(url)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self, role):
+        connection = socket.create_connection(self.address)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection.sendall(f'{role} {self.channel}\n'.encode('utf-8'))
+        return connection
+
+    def _publish(self, data):
+        frame = (json.dumps(data) + '\n').encode('utf-8')
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect('PUB')
+                    self._publisher.sendall(frame)
+                    return
+                except OSError:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        retry_delay = 0.5
+        while True:
+            try:
+                connection = self._connect('SUB')
+                retry_delay = 0.5
+                with connection.makefile('rb') as stream:
+                    for line in stream:
+                        try:
+                            message = json.loads(line)
+                        except ValueError:
+                            message = None
+                        if isinstance(message, dict):
+                            yield message
+                        else:
+                            logger.warning('Ignoring malformed frame from the local message broker')
+            except OSError:
+                logger.error('Lost connection to the local message broker, retrying in %ss', retry_delay)
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 10)
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        header = self.rfile.readline().decode('utf-8').split()
+        if len(header) != 2 or header[0] not in ('PUB', 'SUB'):
+            return
+
+        role, channel = header
+        if role == 'PUB':
+            for line in self.rfile:
+                self.server.publish(channel, line)
+            return
+
+        outbox = queue.Queue()
+        self.server.subscribe(channel, outbox)
+        try:
+            while True:
+                self.wfile.write(outbox.get())
+        except OSError:
+            pass
+        finally:
+            self.server.unsubscribe(channel, outbox)
+
+class LocalBroker(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, BrokerHandler)
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, channel, outbox):
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(outbox)
+
+    def unsubscribe(self, channel, outbox):
+        with self.lock:
+            self.subscribers.get(channel, set()).discard(outbox)
+
+    def publish(self, channel, frame):
+        with self.lock:
+            outboxes = list(self.subscribers.get(channel, ()))
+        for outbox in outboxes:
+            outbox.put(frame)
+
+def message_queue_options(url):
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalSocketManager(url)}
+    return {'message_queue': url}
+
+def run_broker(host='127.0.0.1', port=5555):
+    with LocalBroker((host, port)) as broker:
+        print(f'Local message broker listening on {host}:{port}')
+        broker.serve_forever()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Socket.IO message broker for multi-worker testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    args = parser.parse_args()
+    run_broker(args.host, args.port)
\ No newline at end of file
@@ -0,0 +1,132 @@
+from src.misc import db
+from sqlalchemy import text, bindparam
+import base64
+import re
+
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+    "text, content='message', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN "
+    "INSERT INTO message_fts(rowid, text) VALUES (new.id, new.text); END",
+
+    "CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN "
+    "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+
+    "CREATE TRIGGER IF NOT EXISTS message_fts_update AFTER UPDATE OF text ON message BEGIN "
+    "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO message_fts(rowid, text) VALUES (new.id, new.text); END"
+]
+
+def search_supported():
+    return db.engine.dialect.name == 'sqlite'
+
+def ensure_search_index():
+    if not search_supported():
+        return False
+
+    with db.engine.begin() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_fts'"
+        )).first()
+        for statement in FTS_SCHEMA:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text("INSERT INTO message_fts(message_fts) VALUES ('rebuild')"))
+
+    return True
+
+def rebuild_search_index():
+    with db.engine.begin() as connection:
+        for statement in FTS_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO message_fts(message_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO message_fts(message_fts) VALUES ('optimize')"))
+
+def build_match_query(query):
+    terms = re.findall(r'(\w+)(\*?)', query or '', re.UNICODE)
+    if not terms:
+        return None
+
+    return ' '.join(f'"{term}"{star}' for term, star in terms)
+
+def encode_search_cursor(message_id, score=None, floor=None):
+    raw = f"{message_id}|{score!r}|{floor}" if score is not None else str(message_id)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_search_cursor(cursor, sort):
+    raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    if sort == 'relevance':
+        message_id, score, floor = raw.split('|')
+        return int(message_id), float(score), int(floor)
+    return int(raw), None, None
+
+def search_messages(match, channel_id=None, since=None, until=None, cursor=None,
+                    sort='relevance', limit=20, rank_window=5000):
+    conditions = ["message_fts MATCH :match"]
+    params = {'match': match, 'limit': limit + 1}
+
+    if channel_id:
+        conditions.append("m.channel_id = :channel_id")
+        params['channel_id'] = channel_id
+    if since:
+        conditions.append("m.timestamp >= :since")
+        params['since'] = since
+    if until:
+        conditions.append("m.timestamp < :until")
+        params['until'] = until
+
+    def select(columns, where, order, limit_clause):
+        statement = text(
+            f"SELECT {columns} FROM message_fts JOIN message m ON m.id = message_fts.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY {order} {limit_clause}"
+        )
+        if since:
+            statement = statement.bindparams(bindparam('since', type_=db.DateTime))
+        if until:
+            statement = statement.bindparams(bindparam('until', type_=db.DateTime))
+        return statement
+
+    cursor_id, cursor_score, floor = cursor or (None, None, None)
+
+    if sort == 'relevance':
+        if floor is None:
+            floor = 0
+            if rank_window:
+                floor = db.session.execute(
+                    select("message_fts.rowid", conditions, "message_fts.rowid DESC", "LIMIT 1 OFFSET :window"),
+                    dict(params, window=rank_window - 1)
+                ).scalar() or 0
+
+        conditions.append("message_fts.rowid >= :floor")
+        params['floor'] = floor
+        if cursor_id is not None:
+            conditions.append("(bm25(message_fts) > :cursor_score OR "
+                              "(bm25(message_fts) = :cursor_score AND message_fts.rowid < :cursor_id))")
+            params.update(cursor_score=cursor_score, cursor_id=cursor_id)
+        order = "score, message_fts.rowid DESC"
+
+    else:
+        if cursor_id is not None:
+            conditions.append("message_fts.rowid < :cursor_id")
+            params['cursor_id'] = cursor_id
+        order = "message_fts.rowid DESC"
+
+    statement = select(
+        "m.id, m.channel_id, m.user_id, m.username, m.text, m.timestamp, bm25(message_fts) AS score",
+        conditions, order, "LIMIT :limit"
+    ).columns(timestamp=db.DateTime)
+
+    rows = db.session.execute(statement, params).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        if sort == 'relevance':
+            next_cursor = encode_search_cursor(last.id, last.score, floor)
+        else:
+            next_cursor = encode_search_cursor(last.id)
+
+    return rows, next_cursor
\ No newline at end of file
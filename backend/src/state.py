@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+
+class MemoryStateStore:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            return self._data.get(namespace, {}).get(key, default)
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespace, key):
+        with self._lock:
+            entries = self._data.get(namespace)
+            if entries is None or key not in entries:
+                return False
+            del entries[key]
+            if not entries:
+                del self._data[namespace]
+            return True
+
+    def items(self, namespace):
+        with self._lock:
+            return dict(self._data.get(namespace, {}))
+
+class SqliteStateStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+            'PRIMARY KEY (namespace, key)) WITHOUT ROWID'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace, key, default=None):
+        row = self._connection().execute(
+            'SELECT value FROM state WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace, key, value):
+        self._connection().execute(
+            'INSERT INTO state (namespace, key, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value',
+            (namespace, key, json.dumps(value))
+        )
+
+    def delete(self, namespace, key):
+        cursor = self._connection().execute(
+            'DELETE FROM state WHERE namespace = ? AND key = ?', (namespace, key)
+        )
+        return cursor.rowcount > 0
+
+    def items(self, namespace):
+        rows = self._connection().execute(
+            'SELECT key, value FROM state WHERE namespace = ?', (namespace,)
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+class RedisStateStore:
+    def __init__(self, url, prefix='cartesian:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The redis package is required for a redis:// state store')
+
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, namespace):
+        return self.prefix + namespace
+
+    def get(self, namespace, key, default=None):
+        value = self._redis.hget(self._key(namespace), key)
+        return json.loads(value) if value is not None else default
+
+    def set(self, namespace, key, value):
+        self._redis.hset(self._key(namespace), key, json.dumps(value))
+
+    def delete(self, namespace, key):
+        return self._redis.hdel(self._key(namespace), key) > 0
+
+    def items(self, namespace):
+        entries = self._redis.hgetall(self._key(namespace))
+        return {key.decode('utf-8'): json.loads(value) for key, value in entries.items()}
+
+def create_state_store(url):
+    if not url or url == 'memory://':
+        return MemoryStateStore()
+    if url.startswith('sqlite:///'):
+        return SqliteStateStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisStateStore(url)
+    raise ValueError(f'Unsupported state store URL: {url}')
+
+class SharedState:
+    def __init__(self, app=None):
+        self.backend = MemoryStateStore()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = create_state_store(app.config.get('STATE_STORE_URL'))
+
+    def get(self, namespace, key, default=None):
+        return self.backend.get(namespace, key, default)
+
+    def set(self, namespace, key, value):
+        self.backend.set(namespace, key, value)
+
+    def delete(self, namespace, key):
+        return self.backend.delete(namespace, key)
+
+    def items(self, namespace):
+        return self.backend.items(namespace)
+
+shared_state = SharedState()
\ No newline at end of file
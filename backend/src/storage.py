@@ -0,0 +1,62 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import os
+import sqlite3
+
+DEFAULT_DATABASE_URI = 'sqlite:///users.db'
+
+sqlite_pragmas = {}
+
+def configure_storage(app):
+    uri = os.environ.get('DATABASE_URI') or app.config.get('SQLALCHEMY_DATABASE_URI') or DEFAULT_DATABASE_URI
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+
+    engine_options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
+    if uri.startswith('sqlite'):
+        app.config.setdefault('SQLITE_TUNING', True)
+        app.config.setdefault('SQLITE_JOURNAL_MODE', 'WAL')
+        app.config.setdefault('SQLITE_SYNCHRONOUS', 'NORMAL')
+        app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5000)
+        app.config.setdefault('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+        app.config.setdefault('SQLITE_CACHE_SIZE', -64 * 1024)
+
+        sqlite_pragmas.clear()
+        if app.config['SQLITE_TUNING']:
+            sqlite_pragmas.update({
+                'journal_mode': app.config['SQLITE_JOURNAL_MODE'],
+                'synchronous': app.config['SQLITE_SYNCHRONOUS'],
+                'busy_timeout': app.config['SQLITE_BUSY_TIMEOUT'],
+                'mmap_size': app.config['SQLITE_MMAP_SIZE'],
+                'cache_size': app.config['SQLITE_CACHE_SIZE'],
+                'temp_store': 'MEMORY'
+            })
+
+            connect_args = dict(engine_options.get('connect_args', {}))
+            connect_args.setdefault('timeout', app.config['SQLITE_BUSY_TIMEOUT'] / 1000)
+            engine_options['connect_args'] = connect_args
+
+    else:
+        app.config.setdefault('DATABASE_POOL_SIZE', 10)
+        app.config.setdefault('DATABASE_MAX_OVERFLOW', 20)
+        app.config.setdefault('DATABASE_POOL_TIMEOUT', 30)
+        app.config.setdefault('DATABASE_POOL_RECYCLE', 1800)
+
+        engine_options.setdefault('pool_size', app.config['DATABASE_POOL_SIZE'])
+        engine_options.setdefault('max_overflow', app.config['DATABASE_MAX_OVERFLOW'])
+        engine_options.setdefault('pool_timeout', app.config['DATABASE_POOL_TIMEOUT'])
+        engine_options.setdefault('pool_recycle', app.config['DATABASE_POOL_RECYCLE'])
+        engine_options.setdefault('pool_pre_ping', True)
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+@event.listens_for(Engine, 'connect')
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not sqlite_pragmas or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas.items():
+        if value is not None:
+            cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
\ No newline at end of file
@@ -0,0 +1,115 @@
+from src.state import shared_state
+from src.background import run_periodically
+from src.wire import broadcast
+import threading
+import time
+
+def channelNamespace(channel_id):
+    return f'typing:{channel_id}'
+
+def userNamespace(user_id):
+    return f'typing_user:{user_id}'
+
+class TypingIndicators:
+    def __init__(self, app=None):
+        self.ttl = 6.0
+        self.refresh_interval = 2.0
+        self.tick = 0.3
+        self.stats = {
+            'updates': 0,
+            'throttled': 0,
+            'expired': 0,
+            'emitted': 0
+        }
+
+        self._expiry = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('TYPING_TTL', self.ttl)
+        self.refresh_interval = app.config.get('TYPING_REFRESH_INTERVAL', self.refresh_interval)
+        self.tick = app.config.get('TYPING_TICK', self.tick)
+
+    def typing_users(self, channel_id):
+        now = time.time()
+        return [
+            entry['username']
+            for entry in shared_state.items(channelNamespace(channel_id)).values()
+            if entry['expires_at'] > now
+        ]
+
+    def update(self, user_id, username, channel_id, is_typing):
+        now = time.time()
+        key = (channel_id, user_id)
+
+        with self._lock:
+            self.stats['updates'] += 1
+            expires_at = self._expiry.get(key)
+
+            if is_typing:
+                if expires_at is not None and now - (expires_at - self.ttl) < self.refresh_interval:
+                    self.stats['throttled'] += 1
+                    return
+                self._expiry[key] = now + self.ttl
+            else:
+                self._expiry.pop(key, None)
+
+        if is_typing:
+            shared_state.set(channelNamespace(channel_id), user_id, {
+                'username': username,
+                'expires_at': now + self.ttl
+            })
+            shared_state.set(userNamespace(user_id), channel_id, now + self.ttl)
+            if expires_at is None:
+                self._mark_dirty(channel_id)
+
+        elif self._remove(user_id, channel_id):
+            self._mark_dirty(channel_id)
+
+    def clear_user(self, user_id):
+        for channel_id in shared_state.items(userNamespace(user_id)):
+            with self._lock:
+                self._expiry.pop((channel_id, user_id), None)
+            if self._remove(user_id, channel_id):
+                self._mark_dirty(channel_id)
+
+    def flush(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, expires_at in self._expiry.items() if expires_at <= now]
+            for key in expired:
+                del self._expiry[key]
+
+        for channel_id, user_id in expired:
+            self.stats['expired'] += 1
+            if self._remove(user_id, channel_id):
+                self._mark_dirty(channel_id)
+
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+
+        for channel_id in dirty:
+            broadcast('typing_update', {
+                'channel_id': channel_id,
+                'typing_users': self.typing_users(channel_id)
+            }, room=channel_id)
+            self.stats['emitted'] += 1
+
+    def _remove(self, user_id, channel_id):
+        shared_state.delete(userNamespace(user_id), channel_id)
+        return shared_state.delete(channelNamespace(channel_id), user_id)
+
+    def _mark_dirty(self, channel_id):
+        with self._lock:
+            self._dirty.add(channel_id)
+
+            if not self._started:
+                self._started = True
+                run_periodically(self.tick, self.flush)
+
+typing_indicators = TypingIndicators()
\ No newline at end of file
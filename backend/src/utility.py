@@ -1,12 +1,26 @@
-from flask import jsonify, request
-from src.misc import User, bcrypt, db, Message
+from flask import jsonify, request, current_app, Response, stream_with_context
+from src.misc import User, db, Message, Reaction, ReadCursor
+from src.hashing import password_hasher, PoolSaturated
+from src.writer import message_writer
+from src.presence import presence_tracker
+from src.typing_indicators import typing_indicators
+from src.identity_cache import identity_cache
+from src.history_cache import history_cache
+from src.retention import retention_manager
+from src.wire import broadcast, broadcaster, wire_room
+from src.responder import ai_responder
+from src.intents import intent_matcher
+from src.ratelimit import rate_limiter
+from src.membership import membership
+from src.dispatcher import dispatcher
 import re
 from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, verify_jwt_in_request, get_jwt_identity
 from functools import wraps
 from datetime import datetime, timedelta, timezone
 import json
-from flask_socketio import emit
-import random
+from flask_socketio import emit, join_room
+from sqlalchemy import and_, func, select, tuple_, union_all
+import base64
 
 COMMON_PASSWORDS = {
     'password', 'letmein', '123456', 'password123', 'admin123',
@@ -18,21 +32,8 @@ RESERVED_USERNAMES = {
     'admin', 'root', 'user', 'test', 'demo', 'null', 'undefined', 'sample'
 }
 
-AI_RESPONSES = [
-    "I understand your message. How can I help you further?",
-    "That's interesting! Tell me more about that.",
-    "I'm here to assist you. What would you like to know?",
-    "Thanks for your message! Is there anything specific you'd like to discuss?",
-    "I see what you mean. Let me think about that for a moment...",
-    "Great question! Here's what I think...",
-    "I appreciate you reaching out. How can I be of assistance?",
-    "That's a thoughtful point. Would you like to explore it further?",
-    "I'm processing your request. Is there anything else you need?",
-    "Interesting perspective! I'd love to hear more of your thoughts."
-]
-
-online_users = {}
-typing_users = {}
+CHANNELS = ['general', 'random', 'tech', 'gaming', 'erik_ai', 'sarah_chen', 'alex_johnson']
+
 
 def checkCredentials(username, password):
     if not username or not password:
@@ -44,7 +45,16 @@ def checkCredentials(username, password):
 
     user = User.query.filter_by(username=username.strip().lower()).first()
 
-    if not user or not bcrypt.check_password_hash(user.password_hash, password):
+    try:
+        valid = user is not None and password_hasher.check_password_hash(user.password_hash, password)
+    except PoolSaturated:
+        return jsonify({
+            "message": "Server is busy, please try again shortly",
+            "success": False,
+            "error_type": "server_busy"
+        }), 503
+
+    if not valid:
         return jsonify({
             "message": "Invalid username or password",
             "success": False,
@@ -63,93 +73,45 @@ def checkCredentials(username, password):
         "refresh_token": refresh_token
     }), 200
 
-def checkFormat(username, password):
+def validateFormat(username, password):
     if not username or not password:
-        return jsonify({
-            "message": "Both username and password are required",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Both username and password are required"
 
     if not isinstance(username, str) or not isinstance(password, str):
-        return jsonify({
-            "message": "Username and password must be strings",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username and password must be strings"
 
     if not username.strip() or not password.strip():
-        return jsonify({
-            "message": "Username and password cannot be empty or whitespace",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username and password cannot be empty or whitespace"
 
     username = username.strip().lower()
     password = password.strip()
 
     if len(username) < 4 or len(username) > 32:
-        return jsonify({
-            "message": "Username must be between 4 and 32 characters",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username must be between 4 and 32 characters"
 
     if not re.match(r'^[A-Za-z0-9_.]+$', username):
-        return jsonify({
-            "message": "Username can only contain letters, numbers, underscore, and period",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username can only contain letters, numbers, underscore, and period"
 
     if username[0].isdigit():
-        return jsonify({
-            "message": "Username cannot start with a number",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username cannot start with a number"
 
     if username[0] in '_.' or username[-1] in '_.':
-        return jsonify({
-            "message": "Username cannot start or end with underscore or period",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username cannot start or end with underscore or period"
 
     if '__' in username or '..' in username:
-        return jsonify({
-            "message": "Username cannot contain consecutive underscores or periods",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username cannot contain consecutive underscores or periods"
 
     if username.isdigit():
-        return jsonify({
-            "message": "Username cannot be entirely numeric",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username cannot be entirely numeric"
 
     if username in RESERVED_USERNAMES:
-        return jsonify({
-            "message": "This username is not allowed",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "This username is not allowed"
 
     if username == password.lower():
-        return jsonify({
-            "message": "Username and password cannot be the same",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Username and password cannot be the same"
 
     if len(password) < 8 or len(password) > 64:
-        return jsonify({
-            "message": "Password must be between 8 and 64 characters",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Password must be between 8 and 64 characters"
 
     has_upper = bool(re.search(r'[A-Z]', password))
     has_lower = bool(re.search(r'[a-z]', password))
@@ -159,25 +121,13 @@ def checkFormat(username, password):
     complexity_count = sum([has_upper, has_lower, has_digit, has_special])
 
     if complexity_count < 3:
-        return jsonify({
-            "message": "Password must contain at least 3 of: uppercase, lowercase, numbers, special characters",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Password must contain at least 3 of: uppercase, lowercase, numbers, special characters"
 
     if password.lower() in COMMON_PASSWORDS:
-        return jsonify({
-            "message": "Password is too common. Please choose a stronger password",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Password is too common. Please choose a stronger password"
 
     if re.search(r'(.)\1{5,}', password):
-        return jsonify({
-            "message": "Password cannot contain repetitive characters",
-            "success": False,
-            "error_type": "bad_format"
-        }), 400
+        return "Password cannot contain repetitive characters"
 
     sequences = [
         'abcdefghijklmnopqrstuvwxyz', '0123456789',
@@ -187,15 +137,18 @@ def checkFormat(username, password):
     for seq in sequences:
         for i in range(len(seq) - 5):
             if seq[i:i+6] in password_lower or seq[i:i+6][::-1] in password_lower:
-                return jsonify({
-                    "message": "Password cannot contain sequential characters or keyboard patterns",
-                    "success": False,
-                    "error_type": "bad_format"
-                }), 400
+                return "Password cannot contain sequential characters or keyboard patterns"
 
     if username in password.lower():
+        return "Password cannot contain your username"
+
+    return None
+
+def checkFormat(username, password):
+    error = validateFormat(username, password)
+    if error:
         return jsonify({
-            "message": "Password cannot contain your username",
+            "message": error,
             "success": False,
             "error_type": "bad_format"
         }), 400
@@ -217,7 +170,15 @@ def addUser(username, password):
         }), 409
 
     try:
-        hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_pw = password_hasher.generate_password_hash(password)
+    except PoolSaturated:
+        return jsonify({
+            "message": "Server is busy, please try again shortly",
+            "success": False,
+            "error_type": "server_busy"
+        }), 503
+
+    try:
         new_user = User(username=username, password_hash=hashed_pw)
         db.session.add(new_user)
         db.session.commit()
@@ -237,12 +198,120 @@ def addUser(username, password):
             "error_type": "server_error"
         }), 500
 
+def provisionUsers(entries, chunk_size=500):
+    results = []
+    candidates = {}
+
+    for index, entry in enumerate(entries):
+        username = entry.get('user') if isinstance(entry, dict) else None
+        password = entry.get('password') if isinstance(entry, dict) else None
+
+        error = validateFormat(username, password)
+        if error is None:
+            username = username.strip().lower()
+            if username in candidates:
+                error = "Duplicate username in request"
+
+        results.append({
+            'index': index,
+            'username': username if isinstance(username, str) else None,
+            'success': False,
+            'error': error
+        })
+        if error is None:
+            candidates[username] = (index, password)
+
+    usernames = list(candidates)
+    for start in range(0, len(usernames), chunk_size):
+        chunk = usernames[start:start + chunk_size]
+        for (existing,) in db.session.query(User.username).filter(User.username.in_(chunk)):
+            index, _ = candidates.pop(existing)
+            results[index]['error'] = "Username already exists"
+
+    if not candidates:
+        return results
+
+    usernames = list(candidates)
+    hashes = password_hasher.generate_password_hashes([candidates[u][1] for u in usernames])
+    rows = [{'username': u, 'password_hash': h} for u, h in zip(usernames, hashes)]
+
+    try:
+        statement = dialectInsert(User)
+        if statement is not None:
+            db.session.execute(statement.on_conflict_do_nothing(index_elements=['username']), rows)
+        else:
+            db.session.execute(User.__table__.insert(), rows)
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+        for u in usernames:
+            results[candidates[u][0]]['error'] = "Internal server error while creating user"
+        return results
+
+    expected = {row['username']: row['password_hash'] for row in rows}
+    for start in range(0, len(usernames), chunk_size):
+        chunk = usernames[start:start + chunk_size]
+        for user_id, username, password_hash in db.session.query(User.id, User.username, User.password_hash) \
+                .filter(User.username.in_(chunk)):
+            result = results[candidates[username][0]]
+            if password_hash == expected[username]:
+                result.update({'success': True, 'user_id': user_id, 'error': None})
+            else:
+                result['error'] = "Username already exists"
+
+    return results
+
+def bulk_add_users(user):
+    if user.username not in current_app.config.get('ADMIN_USERNAMES', ()):
+        return jsonify({
+            "message": "Bulk provisioning is restricted to administrators",
+            "success": False,
+            "error_type": "forbidden"
+        }), 403
+
+    data = request.get_json(silent=True) or {}
+    entries = data.get('users')
+    limit = current_app.config.get('BULK_PROVISION_LIMIT', 10000)
+
+    if not isinstance(entries, list) or not entries:
+        return jsonify({
+            "message": "A non-empty 'users' list is required",
+            "success": False,
+            "error_type": "bad_format"
+        }), 400
+
+    if len(entries) > limit:
+        return jsonify({
+            "message": f"At most {limit} users can be provisioned per request",
+            "success": False,
+            "error_type": "too_many_users"
+        }), 413
+
+    try:
+        results = provisionUsers(entries)
+    except PoolSaturated:
+        return jsonify({
+            "message": "Server is busy, please try again shortly",
+            "success": False,
+            "error_type": "server_busy"
+        }), 503
+
+    created = sum(1 for result in results if result['success'])
+    return jsonify({
+        "message": f"Provisioned {created} of {len(results)} users",
+        "success": True,
+        "created": created,
+        "failed": len(results) - created,
+        "results": results
+    }), 200
+
 def verifyAccessToken():
     try:
         verify_jwt_in_request()
         user_id = get_jwt_identity()
 
-        user = User.query.get(user_id)
+        user = identity_cache.get_user(user_id)
         if not user:
             return None, jsonify({
                 "message": "User not found",
@@ -296,21 +365,76 @@ def createNewAccessToken(user_id):
             "error_type": "token_creation_failed"
         }), 500
 
-def displayUsers():
+def filterUsernamePrefix(query, prefix):
+    prefix = (prefix or '').strip().lower()
+    if not prefix:
+        return query
+
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return query.filter(User.username >= prefix, User.username < upper_bound)
+
+def listUsers(prefix=None, after=None, limit=100):
+    query = filterUsernamePrefix(db.session.query(User.id, User.username), prefix)
+    if after:
+        query = query.filter(User.username > after)
+
+    rows = query.order_by(User.username).limit(limit + 1).all()
+
+    users = [{"id": user_id, "username": username} for user_id, username in rows[:limit]]
+    next_cursor = users[-1]["username"] if len(rows) > limit else None
+    return users, next_cursor
+
+def streamUsers(prefix=None, after=None, batch_size=1000):
+    query = filterUsernamePrefix(db.session.query(User.id, User.username), prefix)
+    if after:
+        query = query.filter(User.username > after)
+
+    query = query.order_by(User.username).execution_options(yield_per=batch_size)
+    for user_id, username in query:
+        yield json.dumps({"id": user_id, "username": username}) + '\n'
+
+def getDirectoryArgs():
+    limit = request.args.get('limit', 100, type=int)
+    return (
+        request.args.get('prefix') or None,
+        request.args.get('after') or None,
+        max(1, min(limit, current_app.config.get('USER_DIRECTORY_MAX_LIMIT', 1000)))
+    )
+
+def get_user_directory(user):
+    prefix, after, limit = getDirectoryArgs()
+
     try:
-        users = User.query.all()
+        if request.args.get('format') == 'ndjson':
+            return Response(stream_with_context(streamUsers(prefix, after)),
+                            mimetype='application/x-ndjson')
 
-        user_list = []
-        for user in users:
-            user_list.append({
-                "id": user.id,
-                "username": user.username
-            })
+        users, next_cursor = listUsers(prefix, after, limit)
+        return jsonify({
+            "success": True,
+            "users": users,
+            "next_cursor": next_cursor
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "message": "Failed to retrieve users",
+            "success": False,
+            "error_type": "database_error"
+        }), 500
+
+def displayUsers():
+    prefix, after, limit = getDirectoryArgs()
+
+    try:
+        total_users = db.session.query(func.count(User.id)).scalar()
+        users, next_cursor = listUsers(prefix, after, limit)
 
         return {
-            "total_users": len(users),
+            "total_users": total_users,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "users": user_list
+            "users": users,
+            "next_cursor": next_cursor
         }, None, None
 
     except Exception as e:
@@ -320,6 +444,22 @@ def displayUsers():
             "error_type": "database_error"
         }), 500
 
+def collectStats():
+    return {
+        'identity_cache': identity_cache.snapshot(),
+        'password_hasher': password_hasher.snapshot(),
+        'history_cache': history_cache.snapshot(),
+        'retention': retention_manager.snapshot(),
+        'wire': dict(broadcaster.stats),
+        'ai_responder': ai_responder.snapshot(),
+        'rate_limiter': rate_limiter.snapshot(),
+        'membership': membership.snapshot(),
+        'dispatcher': dispatcher.snapshot(),
+        'message_writer': dict(message_writer.stats, pending=message_writer.pending()),
+        'presence': dict(presence_tracker.stats),
+        'typing': dict(typing_indicators.stats)
+    }
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -343,36 +483,40 @@ def extractAccessTokenFromWebSocket():
 
 def validateAccessToken(access_token):
     try:
-        decoded = decode_token(access_token)
-
-        exp_timestamp = decoded.get('exp')
-        if exp_timestamp:
-            current_time = datetime.now(timezone.utc).timestamp()
-            if current_time > exp_timestamp:
+        user_id_int = identity_cache.get_token(access_token)
+        if user_id_int is None:
+            decoded = decode_token(access_token)
+
+            exp_timestamp = decoded.get('exp')
+            if exp_timestamp:
+                current_time = datetime.now(timezone.utc).timestamp()
+                if current_time > exp_timestamp:
+                    return None, jsonify({
+                        "message": "Token has expired",
+                        "success": False,
+                        "error_type": "expired_token"
+                    }), 401
+
+            user_id = decoded.get('sub')
+            if not user_id:
                 return None, jsonify({
-                    "message": "Token has expired",
+                    "message": "Invalid token format",
                     "success": False,
-                    "error_type": "expired_token"
+                    "error_type": "invalid_token"
                 }), 401
 
-        user_id = decoded.get('sub')
-        if not user_id:
-            return None, jsonify({
-                "message": "Invalid token format",
-                "success": False,
-                "error_type": "invalid_token"
-            }), 401
+            try:
+                user_id_int = int(user_id)
+            except (ValueError, TypeError):
+                return None, jsonify({
+                    "message": "Invalid user ID format",
+                    "success": False,
+                    "error_type": "invalid_token"
+                }), 401
 
-        try:
-            user_id_int = int(user_id)
-        except (ValueError, TypeError):
-            return None, jsonify({
-                "message": "Invalid user ID format",
-                "success": False,
-                "error_type": "invalid_token"
-            }), 401
+            identity_cache.put_token(access_token, user_id_int, exp_timestamp)
 
-        user = User.query.get(user_id_int)
+        user = identity_cache.get_user(user_id_int)
         if not user:
             return None, jsonify({
                 "message": "User not found",
@@ -393,49 +537,298 @@ def validateAccessToken(access_token):
             "error_type": "invalid_access_token"
         }), 401
 
+def encodeMessageCursor(message):
+    raw = f"{message['timestamp']}|{message['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decodeMessageCursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, message_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(timestamp), int(message_id)), None, None
+
+    except ValueError:
+        return None, jsonify({
+            "message": "Invalid message cursor",
+            "success": False,
+            "error_type": "invalid_cursor"
+        }), 400
+
+def buildMessagePayload(message_id, channel_id, user_id, username, text, timestamp, reactions=None):
+    reactions = reactions or {}
+    return {
+        'id': message_id,
+        'channel_id': channel_id,
+        'user_id': str(user_id),
+        'user': username,
+        'text': text,
+        'timestamp': timestamp.isoformat(),
+        'reactions': reactions,
+        'reaction_counts': countReactions(reactions)
+    }
+
+def serializeMessage(msg, reactions=None):
+    return buildMessagePayload(msg.id, msg.channel_id, msg.user_id, msg.username,
+                               msg.text, msg.timestamp, reactions)
+
+def withReadState(messages, user_id, last_read_id, others_read_id):
+    user_id = str(user_id)
+    return [
+        dict(message, is_read=message['id'] <= (others_read_id if message['user_id'] == user_id else last_read_id))
+        for message in messages
+    ]
+
+def countReactions(reactions):
+    return {emoji: len(users) for emoji, users in reactions.items()}
+
+def getReactions(message_ids):
+    reactions = {message_id: {} for message_id in message_ids}
+    if not message_ids:
+        return reactions
+
+    rows = db.session.query(Reaction.message_id, Reaction.emoji, Reaction.user_id, Reaction.username) \
+        .filter(Reaction.message_id.in_(message_ids)) \
+        .order_by(Reaction.id) \
+        .all()
+
+    for message_id, emoji, user_id, username in rows:
+        reactions[message_id].setdefault(emoji, []).append({
+            'user_id': str(user_id),
+            'username': username
+        })
+
+    return reactions
+
+def dialectInsert(model):
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+
+    return insert(model)
+
+def toggleReaction(message_id, emoji, user_id, username):
+    removed = Reaction.query.filter_by(message_id=message_id, emoji=emoji, user_id=user_id) \
+        .delete(synchronize_session=False)
+
+    if not removed:
+        statement = dialectInsert(Reaction)
+        if statement is not None:
+            db.session.execute(statement.values(
+                message_id=message_id,
+                emoji=emoji,
+                user_id=user_id,
+                username=username
+            ).on_conflict_do_nothing())
+        else:
+            db.session.add(Reaction(message_id=message_id, emoji=emoji, user_id=user_id, username=username))
+
+    db.session.commit()
+    return not removed
+
+def migrateReactions(batch_size=500):
+    migrated = 0
+    last_id = 0
+
+    while True:
+        rows = db.session.query(Message.id, Message.reactions) \
+            .filter(Message.id > last_id, Message.reactions.isnot(None), Message.reactions != '{}') \
+            .order_by(Message.id) \
+            .limit(batch_size) \
+            .all()
+        if not rows:
+            return migrated
+
+        reaction_rows = []
+        for message_id, blob in rows:
+            try:
+                reactions = json.loads(blob) if blob else {}
+            except ValueError:
+                reactions = {}
+
+            for emoji, users in reactions.items():
+                for u in users:
+                    try:
+                        user_id = int(u['user_id'])
+                    except (KeyError, ValueError, TypeError):
+                        continue
+                    reaction_rows.append({
+                        'message_id': message_id,
+                        'emoji': emoji,
+                        'user_id': user_id,
+                        'username': u.get('username') or ''
+                    })
+
+        if reaction_rows:
+            statement = dialectInsert(Reaction)
+            if statement is not None:
+                db.session.execute(statement.on_conflict_do_nothing(), reaction_rows)
+            else:
+                db.session.execute(Reaction.__table__.insert(), reaction_rows)
+
+        message_ids = [message_id for message_id, _ in rows]
+        Message.query.filter(Message.id.in_(message_ids)) \
+            .update({'reactions': '{}'}, synchronize_session=False)
+        db.session.commit()
+
+        migrated += len(reaction_rows)
+        last_id = message_ids[-1]
+
+def getReadCursor(user_id, channel_id):
+    cursor = db.session.get(ReadCursor, (user_id, channel_id))
+    return cursor.last_read_id if cursor else 0
+
+def getOthersReadCursor(user_id, channel_id):
+    rows = db.session.query(ReadCursor.user_id, ReadCursor.last_read_id) \
+        .filter(ReadCursor.channel_id == channel_id) \
+        .order_by(ReadCursor.last_read_id.desc()) \
+        .limit(2).all()
+    return next((last_read_id for reader_id, last_read_id in rows if reader_id != user_id), 0)
+
+def markChannelRead(user_id, channel_id, last_read_id):
+    statement = dialectInsert(ReadCursor)
+
+    if statement is not None:
+        statement = statement.values(
+            user_id=user_id,
+            channel_id=channel_id,
+            last_read_id=last_read_id
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=['user_id', 'channel_id'],
+            set_={'last_read_id': statement.excluded.last_read_id},
+            where=ReadCursor.last_read_id < statement.excluded.last_read_id
+        )
+        db.session.execute(statement)
+    else:
+        cursor = db.session.get(ReadCursor, (user_id, channel_id))
+        if cursor is None:
+            db.session.add(ReadCursor(user_id=user_id, channel_id=channel_id, last_read_id=last_read_id))
+        elif cursor.last_read_id < last_read_id:
+            cursor.last_read_id = last_read_id
+
+    db.session.commit()
+
+def getUnreadCounts(user_id, channels=CHANNELS):
+    rows = db.session.query(Message.channel_id, func.count(Message.id)) \
+        .outerjoin(ReadCursor, and_(ReadCursor.user_id == user_id,
+                                    ReadCursor.channel_id == Message.channel_id)) \
+        .filter(Message.channel_id.in_(channels),
+                Message.user_id != user_id,
+                Message.id > func.coalesce(ReadCursor.last_read_id, 0)) \
+        .group_by(Message.channel_id) \
+        .all()
+
+    unread_counts = {channel: 0 for channel in channels}
+    unread_counts.update(rows)
+    return unread_counts
+
+def get_unread_counts(user):
+    channels = request.args.get('channels')
+    channels = [c for c in channels.split(',') if c] if channels else CHANNELS
+
+    try:
+        return jsonify({
+            'success': True,
+            'unread_counts': getUnreadCounts(user.id, channels)
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'unread_counts': {},
+            'error': str(e)
+        }), 500
+
 def get_chat_messages(user, channel_id):
-    page = request.args.get('page', 1, type=int)
+    before = request.args.get('before')
+    after = request.args.get('after')
+    page = request.args.get('page', type=int)
     per_page = 50
 
+    cursor = None
+    if before or after:
+        cursor, error_response, status_code = decodeMessageCursor(before or after)
+        if cursor is None:
+            return error_response, status_code
+
+    first_page = cursor is None and not (page and page > 1)
+
     try:
-        messages_query = Message.query.filter_by(channel_id=channel_id) \
-            .order_by(Message.timestamp.desc()) \
-            .paginate(page=page, per_page=per_page, error_out=False)
-
-        messages_list = []
-        for msg in messages_query.items:
-            messages_list.append({
-                'id': msg.id,
-                'channel_id': msg.channel_id,
-                'user_id': str(msg.user_id),
-                'user': msg.username,
-                'text': msg.text,
-                'timestamp': msg.timestamp.isoformat(),
-                'is_read': msg.is_read,
-                'reactions': json.loads(msg.reactions)
-            })
-
-        messages_list.reverse()
-
-        unread_counts = {}
-        channels = ['general', 'random', 'tech', 'gaming', 'erik_ai', 'sarah_chen', 'alex_johnson']
-
-        for channel in channels:
-            count = Message.query.filter_by(channel_id=channel, is_read=False) \
-                .filter(Message.user_id != user.id).count()
-            unread_counts[channel] = count
-
-        updated = Message.query.filter_by(channel_id=channel_id) \
-            .filter(Message.user_id != user.id) \
-            .update({'is_read': True})
-        db.session.commit()
+        cached = history_cache.page(channel_id, per_page) if first_page else None
+        archived = []
+
+        fill = history_cache.generation(channel_id) if first_page and cached is None else None
+        if fill is not None and message_writer.pending_for(channel_id):
+            fill = None
+
+        if cached is not None:
+            messages_list, has_more = cached
+
+        elif not first_page and cursor is None:
+            messages_query = Message.query.filter_by(channel_id=channel_id) \
+                .order_by(Message.timestamp.desc(), Message.id.desc()) \
+                .paginate(page=page, per_page=per_page, error_out=False)
+            rows = list(reversed(messages_query.items))
+            has_more = messages_query.has_next
+
+        elif after:
+            cursor_timestamp, cursor_id = cursor
+            if cursor_id <= retention_manager.archived_max_id(channel_id):
+                archived = retention_manager.read_after(channel_id, cursor, per_page + 1)
+            rows = Message.query.filter_by(channel_id=channel_id) \
+                .filter(tuple_(Message.timestamp, Message.id) > (cursor_timestamp, cursor_id)) \
+                .order_by(Message.timestamp.asc(), Message.id.asc()) \
+                .limit(per_page + 1 - len(archived)).all()
+            has_more = len(archived) + len(rows) > per_page
+            archived = archived[:per_page]
+            rows = rows[:per_page - len(archived)]
+
+        else:
+            query = Message.query.filter_by(channel_id=channel_id)
+            if cursor is not None:
+                cursor_timestamp, cursor_id = cursor
+                query = query.filter(tuple_(Message.timestamp, Message.id) < (cursor_timestamp, cursor_id))
+            rows = query.order_by(Message.timestamp.desc(), Message.id.desc()) \
+                .limit(per_page + 1).all()
+            if len(rows) <= per_page:
+                boundary = (rows[-1].timestamp, rows[-1].id) if rows else cursor
+                archived = retention_manager.read_before(channel_id, boundary, per_page + 1 - len(rows))
+            has_more = len(rows) + len(archived) > per_page
+            rows = list(reversed(rows[:per_page]))
+            archived = list(reversed(archived[:per_page - len(rows)]))
+
+        if cached is None:
+            reactions = getReactions([msg.id for msg in rows])
+            messages_list = [serializeMessage(msg, reactions[msg.id]) for msg in rows]
+            messages_list = archived + messages_list
+            if fill is not None:
+                history_cache.store(channel_id, messages_list, complete=not has_more, generation=fill)
+
+        last_read_id = getReadCursor(user.id, channel_id)
+        others_read_id = getOthersReadCursor(user.id, channel_id)
+        messages_list = withReadState(messages_list, user.id, last_read_id, others_read_id)
+
+        unread_counts = getUnreadCounts(user.id)
+
+        newest_id = db.session.query(func.max(Message.id)) \
+            .filter(Message.channel_id == channel_id, Message.user_id != user.id) \
+            .scalar()
+        if newest_id and newest_id > last_read_id:
+            markChannelRead(user.id, channel_id, newest_id)
 
         return jsonify({
             'success': True,
             'messages': messages_list,
             'unread_counts': unread_counts,
-            'has_more': messages_query.has_next,
-            'page': page
+            'has_more': has_more,
+            'page': page or 1,
+            'before_cursor': encodeMessageCursor(messages_list[0]) if messages_list else None,
+            'after_cursor': encodeMessageCursor(messages_list[-1]) if messages_list else None
         }), 200
 
     except Exception as e:
@@ -446,124 +839,228 @@ def get_chat_messages(user, channel_id):
             'error': str(e)
         }), 500
 
-def generate_ai_response(user_message):
-    message_lower = user_message.lower()
-
-    if any(greeting in message_lower for greeting in ['hi', 'hello', 'hey', 'greetings']):
-        responses = [
-            "Hello! How can I assist you today?",
-            "Hi there! What can I help you with?",
-            "Greetings! I'm here to help. What's on your mind?",
-            "Hey! Nice to meet you. How can I be of service?"
-        ]
-    elif any(q in message_lower for q in ['how are you', "how're you", 'how do you do']):
-        responses = [
-            "I'm functioning well, thank you for asking! How are you doing?",
-            "I'm here and ready to help! How about you?",
-            "All systems operational! What brings you here today?",
-            "I'm doing great! Thanks for asking. How can I assist you?"
-        ]
-    elif any(q in message_lower for q in ['what can you do', 'help', 'what do you do']):
-        responses = [
-            "I can help with a variety of tasks! Feel free to ask me anything.",
-            "I'm here to assist with questions, provide information, and have conversations!",
-            "I can help answer questions, discuss topics, or just chat. What interests you?",
-            "I'm your AI assistant - I can help with information, answer questions, or just have a friendly chat!"
-        ]
-    elif any(word in message_lower for word in ['thanks', 'thank you', 'appreciate']):
-        responses = [
-            "You're welcome! Is there anything else I can help with?",
-            "Happy to help! Let me know if you need anything else.",
-            "My pleasure! Feel free to ask if you have more questions.",
-            "Glad I could assist! Don't hesitate to reach out again."
+def parseSearchDate(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def search_chat_messages(user):
+    from src.search import search_supported, build_match_query, decode_search_cursor, search_messages
+    from sqlalchemy.exc import OperationalError
+
+    if not search_supported():
+        return jsonify({
+            "message": "Search is not available on this database",
+            "success": False,
+            "error_type": "search_unavailable"
+        }), 503
+
+    match = build_match_query(request.args.get('q'))
+    sort = request.args.get('sort', 'relevance')
+    limit = max(1, min(request.args.get('limit', 20, type=int), current_app.config.get('SEARCH_MAX_LIMIT', 100)))
+
+    if match is None or sort not in ('relevance', 'recent'):
+        return jsonify({
+            "message": "A search query is required and sort must be 'relevance' or 'recent'",
+            "success": False,
+            "error_type": "bad_format"
+        }), 400
+
+    try:
+        since = parseSearchDate(request.args.get('since'))
+        until = parseSearchDate(request.args.get('until'))
+        cursor = request.args.get('cursor')
+        cursor = decode_search_cursor(cursor, sort) if cursor else None
+    except ValueError:
+        return jsonify({
+            "message": "Invalid date or cursor",
+            "success": False,
+            "error_type": "bad_format"
+        }), 400
+
+    try:
+        rows, next_cursor = search_messages(match, request.args.get('channel') or None,
+                                            since, until, cursor, sort, limit,
+                                            current_app.config.get('SEARCH_RANK_WINDOW', 5000))
+        reactions = getReactions([row.id for row in rows])
+        results = [
+            dict(buildMessagePayload(row.id, row.channel_id, row.user_id, row.username,
+                                     row.text, row.timestamp, reactions[row.id]), score=row.score)
+            for row in rows
         ]
-    else:
-        responses = AI_RESPONSES
 
-    return random.choice(responses)
+        return jsonify({
+            "success": True,
+            "results": results,
+            "next_cursor": next_cursor
+        }), 200
 
-def handle_websocket_message(session, data):
-    from flask_socketio import emit
+    except OperationalError as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Search index is unavailable",
+            "success": False,
+            "error_type": "search_unavailable",
+            "error": str(e.orig)
+        }), 503
 
-    channel_id = data.get('channel')
-    text = data.get('text')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'results': [],
+            'error': str(e)
+        }), 500
 
-    if not channel_id or not text:
-        return
+def getReadCursors(user_id, channels):
+    return dict(
+        db.session.query(ReadCursor.channel_id, ReadCursor.last_read_id)
+        .filter(ReadCursor.user_id == user_id, ReadCursor.channel_id.in_(channels))
+    )
+
+def getOthersReadCursors(user_id, channels):
+    return {channel_id: getOthersReadCursor(user_id, channel_id) for channel_id in channels}
+
+def syncChannels(user_id, channels):
+    config = current_app.config
+    per_channel = config.get('SYNC_PER_CHANNEL_LIMIT', 200)
+
+    if not isinstance(channels, dict) or not channels:
+        return None, "A non-empty map of channel_id to last_seen_id is required"
+    if len(channels) > config.get('SYNC_MAX_CHANNELS', 50):
+        return None, f"At most {config.get('SYNC_MAX_CHANNELS', 50)} channels can be synced at once"
+
+    try:
+        last_seen = {str(channel_id): int(last_id or 0) for channel_id, last_id in channels.items()}
+    except (TypeError, ValueError):
+        return None, "last_seen_id values must be integers"
+
+    pages = union_all(*[
+        select(Message.id)
+        .where(Message.channel_id == channel_id, Message.id > last_id)
+        .order_by(Message.id)
+        .limit(per_channel + 1)
+        .subquery()
+        .select()
+        for channel_id, last_id in last_seen.items()
+    ])
+
+    rows = Message.query.filter(Message.id.in_(pages)) \
+        .order_by(Message.channel_id, Message.id) \
+        .all()
+
+    grouped = {channel_id: [] for channel_id in last_seen}
+    for msg in rows:
+        grouped[msg.channel_id].append(msg)
+
+    visible = [msg.id for msg_list in grouped.values() for msg in msg_list[:per_channel]]
+    reactions = getReactions(visible)
+    read_cursors = getReadCursors(user_id, list(last_seen))
+    others_read_cursors = getOthersReadCursors(user_id, list(last_seen))
+
+    result = {}
+    for channel_id, msg_list in grouped.items():
+        messages = [serializeMessage(msg, reactions[msg.id]) for msg in msg_list[:per_channel]]
+        result[channel_id] = {
+            'messages': withReadState(messages, user_id,
+                                      read_cursors.get(channel_id, 0),
+                                      others_read_cursors.get(channel_id, 0)),
+            'has_more': len(msg_list) > per_channel,
+            'last_id': messages[-1]['id'] if messages else last_seen[channel_id]
+        }
+
+    return result, None
+
+def sync_messages(user):
+    data = request.get_json(silent=True) or {}
+
+    try:
+        result, error = syncChannels(user.id, data.get('channels'))
+        if error:
+            return jsonify({
+                "message": error,
+                "success": False,
+                "error_type": "bad_format"
+            }), 400
+
+        return jsonify({
+            "success": True,
+            "channels": result
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'channels': {},
+            'error': str(e)
+        }), 500
 
+def handle_sync_request(session, data):
     user_id = session.get('user_id')
-    username = session.get('username')
+    if not user_id or not isinstance(data, dict):
+        return
+
+    result, error = syncChannels(int(user_id), data.get('channels'))
+    if error:
+        response = {'success': False, 'message': error, 'error_type': 'bad_format'}
+    else:
+        response = {'success': True, 'channels': result}
+
+    return response
+
+def generate_ai_response(user_message):
+    return intent_matcher.respond(user_message)
+
+def saveMessage(channel_id, user_id, username, text):
+    if message_writer.enabled:
+        row = message_writer.submit(channel_id, user_id, username, text)
+        return row['id'], row['timestamp']
 
     message = Message(
         channel_id=channel_id,
-        user_id=int(user_id),
+        user_id=user_id,
         username=username,
         text=text
     )
     db.session.add(message)
     db.session.commit()
+    return message.id, message.timestamp
 
-    emit('message', {
-        'id': message.id,
-        'channel_id': channel_id,
-        'user_id': user_id,
-        'user': username,
-        'text': text,
-        'timestamp': message.timestamp.isoformat(),
-        'reactions': {}
-    }, room=channel_id, include_self=False)
+def postMessage(channel_id, user_id, username, text, skip_sid=None, extra=None):
+    message_id, timestamp = saveMessage(channel_id, int(user_id), username, text)
+    payload = buildMessagePayload(message_id, channel_id, user_id, username, text, timestamp)
+    history_cache.append(channel_id, payload)
 
-    if channel_id == 'erik_ai':
-        ai_response_text = generate_ai_response(text)
+    broadcast('message', dict(payload, **extra) if extra else payload, room=channel_id, skip_sid=skip_sid)
+    return payload
 
-        ai_message = Message(
-            channel_id=channel_id,
-            user_id=999999,
-            username='erik_ai',
-            text=ai_response_text
-        )
-        db.session.add(ai_message)
-        db.session.commit()
+def handle_websocket_message(session, data):
+    channel_id = data.get('channel')
+    text = data.get('text')
 
-        emit('message', {
-            'id': ai_message.id,
-            'channel_id': channel_id,
-            'user_id': '999999',
-            'user': 'erik_ai',
-            'text': ai_response_text,
-            'timestamp': ai_message.timestamp.isoformat(),
-            'reactions': {},
-            'isAI': True
-        }, room=channel_id)
+    if not channel_id or not text:
+        return
 
-def handle_user_typing(session, data):
-    from flask_socketio import emit
+    postMessage(channel_id, session.get('user_id'), session.get('username'), text, skip_sid=request.sid)
 
+    if ai_responder.handles(channel_id):
+        ai_responder.submit(channel_id, text)
+
+def handle_user_typing(session, data):
     channel_id = data.get('channel_id')
     is_typing = data.get('is_typing', False)
 
     user_id = session.get('user_id')
     username = session.get('username')
 
-    if not channel_id or not user_id:
+    if not channel_id or not user_id or not membership.is_member(user_id, channel_id):
         return
 
-    if channel_id not in typing_users:
-        typing_users[channel_id] = {}
-
-    if is_typing:
-        typing_users[channel_id][user_id] = username
-    else:
-        typing_users[channel_id].pop(user_id, None)
-
-    emit('typing_update', {
-        'channel_id': channel_id,
-        'typing_users': list(typing_users[channel_id].values())
-    }, room=channel_id, include_self=False)
+    typing_indicators.update(user_id, username, channel_id, bool(is_typing))
 
 def handle_add_reaction(session, data):
-    from flask_socketio import emit
-
     message_id = data.get('message_id')
     emoji = data.get('emoji')
 
@@ -573,68 +1070,70 @@ def handle_add_reaction(session, data):
     user_id = session.get('user_id')
     username = session.get('username')
 
-    message = Message.query.get(message_id)
-    if not message:
+    if not emoji or not user_id:
         return
 
-    reactions = json.loads(message.reactions)
-    if emoji not in reactions:
-        reactions[emoji] = []
-
-    user_data = {'user_id': user_id, 'username': username}
+    try:
+        message_id = int(message_id)
+    except (TypeError, ValueError):
+        return
 
-    user_exists = any(u['user_id'] == user_id for u in reactions[emoji])
-    if user_exists:
-        reactions[emoji] = [u for u in reactions[emoji] if u['user_id'] != user_id]
-        if not reactions[emoji]:
-            del reactions[emoji]
-    else:
-        reactions[emoji].append(user_data)
+    channel_id = db.session.query(Message.channel_id).filter_by(id=message_id).scalar()
+    if not channel_id:
+        return
 
-    message.reactions = json.dumps(reactions)
-    db.session.commit()
+    toggleReaction(message_id, emoji, int(user_id), username)
+    reactions = getReactions([message_id])[message_id]
+    reaction_counts = countReactions(reactions)
+    history_cache.update_reactions(channel_id, message_id, reactions, reaction_counts)
 
-    emit('reaction_update', {
+    broadcast('reaction_update', {
         'message_id': message_id,
-        'reactions': reactions
-    }, room=message.channel_id)
+        'reactions': reactions,
+        'reaction_counts': reaction_counts
+    }, room=channel_id)
 
 def handle_user_online(session):
-    from flask_socketio import emit
-
     user_id = session.get('user_id')
     username = session.get('username')
 
     if user_id:
-        online_users[user_id] = {
-            'username': username,
-            'status': 'online',
-            'last_seen': datetime.utcnow().isoformat()
-        }
+        presence_tracker.mark_online(user_id, username)
 
         emit('presence_update', {
-            'online_users': online_users
-        }, broadcast=True)
-
-def handle_user_disconnect(session):
-    from flask_socketio import emit
+            'online_users': presence_tracker.snapshot()
+        })
 
+def handle_channel_subscribe(session, data):
     user_id = session.get('user_id')
-    username = session.get('username')
+    channels = data.get('channels') if isinstance(data, dict) else None
 
-    if user_id:
-        if user_id in online_users:
-            online_users[user_id]['status'] = 'offline'
-            online_users[user_id]['last_seen'] = datetime.utcnow().isoformat()
-
-        for channel_id in typing_users:
-            if user_id in typing_users[channel_id]:
-                del typing_users[channel_id][user_id]
-                emit('typing_update', {
-                    'channel_id': channel_id,
-                    'typing_users': list(typing_users[channel_id].values())
-                }, room=channel_id)
+    if not user_id:
+        return
+    if not isinstance(channels, list) or not channels or len(channels) > membership.max_subscribe \
+            or not all(isinstance(channel_id, str) and channel_id for channel_id in channels):
+        response = {
+            'success': False,
+            'message': f'channels must be a list of 1 to {membership.max_subscribe} channel ids',
+            'error_type': 'bad_format'
+        }
+        return response
 
-        emit('presence_update', {
-            'online_users': online_users
-        }, broadcast=True)
\ No newline at end of file
+    channels = list(dict.fromkeys(channels))
+    for channel_id in channels:
+        join_room(wire_room(channel_id, session.get('wire')))
+    membership.join(request.sid, user_id, session.get('username'), channels)
+
+    response = {
+        'success': True,
+        'channels': channels,
+        'unread_counts': getUnreadCounts(int(user_id), channels)
+    }
+    return response
+
+def handle_user_disconnect(session):
+    user_id = session.get('user_id')
+
+    if user_id and not membership.is_connected(user_id):
+        presence_tracker.mark_offline(user_id)
+        typing_indicators.clear_user(user_id)
\ No newline at end of file
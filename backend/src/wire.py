@@ -0,0 +1,125 @@
+from src.misc import socketio
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+COMPACT_KEYS = {
+    'id': 'i',
+    'channel_id': 'c',
+    'user_id': 'u',
+    'user': 'n',
+    'username': 'un',
+    'text': 't',
+    'timestamp': 'ts',
+    'reactions': 'r',
+    'reaction_counts': 'rc',
+    'message_id': 'm',
+    'typing_users': 'tu',
+    'updated': 'up',
+    'removed': 'rm',
+    'status': 's',
+    'last_seen': 'ls',
+    'isAI': 'ai',
+    'isSystem': 'sys'
+}
+
+class WireJSON:
+    @staticmethod
+    def dumps(obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault('separators', (',', ':'))
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        if orjson is None:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+def negotiate(requested):
+    return MSGPACK if requested == MSGPACK and msgpack is not None else JSON
+
+def compact(value):
+    if isinstance(value, dict):
+        return {COMPACT_KEYS.get(key, key): compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    return value
+
+def pack(data):
+    return msgpack.packb(compact(data), use_bin_type=True)
+
+def wire_room(room, wire=JSON):
+    if room is None:
+        return f'wire:{wire}'
+    return room if wire == JSON else f'{room}:{wire}'
+
+class Broadcaster:
+    def __init__(self, app=None):
+        self.shared = False
+        self.dispatcher = None
+        self.stats = {
+            'json_broadcasts': 0,
+            'msgpack_broadcasts': 0,
+            'msgpack_skipped': 0,
+            'direct_sends': 0
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.shared = bool(app.config.get('MESSAGE_QUEUE'))
+
+    def _has_local_members(self, room):
+        rooms = socketio.server.manager.rooms.get('/', {})
+        return bool(rooms.get(room))
+
+    def broadcast(self, event, data, room=None, skip_sid=None):
+        if self.dispatcher is not None and room is not None:
+            self.dispatcher.submit(event, data, room, skip_sid)
+            return
+        self.send(event, data, room, skip_sid)
+
+    def send(self, event, data, room=None, skip_sid=None):
+        socketio.emit(event, data, to=wire_room(room, JSON), skip_sid=skip_sid)
+        self.stats['json_broadcasts'] += 1
+
+        if msgpack is None:
+            return
+
+        binary_room = wire_room(room, MSGPACK)
+        if not self.shared and not self._has_local_members(binary_room):
+            self.stats['msgpack_skipped'] += 1
+            return
+
+        socketio.emit(event, pack(data), to=binary_room, skip_sid=skip_sid)
+        self.stats['msgpack_broadcasts'] += 1
+
+    def send_to(self, sid, event, data, room=None):
+        rooms = socketio.server.manager.rooms.get('/', {})
+        if room is not None and not any(sid in rooms.get(wire_room(room, wire), ()) for wire in (JSON, MSGPACK)):
+            return False
+        if msgpack is not None and sid in rooms.get(wire_room(None, MSGPACK), ()):
+            socketio.emit(event, pack(data), to=sid)
+        else:
+            socketio.emit(event, data, to=sid)
+        self.stats['direct_sends'] += 1
+        return True
+
+broadcaster = Broadcaster()
+
+def broadcast(event, data, room=None, skip_sid=None):
+    broadcaster.broadcast(event, data, room, skip_sid)
\ No newline at end of file
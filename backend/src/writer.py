@@ -0,0 +1,185 @@
+from src.misc import db, Message
+from src.history_cache import history_cache
+from sqlalchemy import func, text
+from datetime import datetime
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class MessageWriter:
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_interval = 0.05
+        self.retries = 5
+        self.retry_backoff = 0.05
+        self.retry_backoff_max = 2.0
+        self.stats = {
+            'queued': 0,
+            'written': 0,
+            'batches': 0,
+            'retries': 0,
+            'failed': 0
+        }
+
+        self._queue = queue.Queue()
+        self._ids = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('MESSAGE_WRITE_BEHIND', False)
+        self.batch_size = app.config.get('MESSAGE_WRITE_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('MESSAGE_WRITE_FLUSH_INTERVAL', self.flush_interval)
+        self.retries = app.config.get('MESSAGE_WRITE_RETRIES', self.retries)
+        self.retry_backoff = app.config.get('MESSAGE_WRITE_RETRY_BACKOFF', self.retry_backoff)
+
+        if self.enabled and app.config.get('MESSAGE_QUEUE'):
+            raise RuntimeError('MESSAGE_WRITE_BEHIND assigns message ids in-process '
+                               'and cannot be combined with a multi-worker MESSAGE_QUEUE')
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            with self.app.app_context():
+                last_id = db.session.query(func.max(Message.id)).scalar() or 0
+                if db.engine.dialect.name == 'sqlite':
+                    sequence = db.session.execute(text(
+                        "SELECT seq FROM sqlite_sequence WHERE name = 'message'"
+                    )).scalar()
+                    last_id = max(last_id, sequence or 0)
+                db.session.remove()
+
+            self._ids = itertools.count(last_id + 1)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, channel_id, user_id, username, text):
+        if self._thread is None:
+            self.start()
+
+        with self._lock:
+            message_id = next(self._ids)
+            self._pending[channel_id] = self._pending.get(channel_id, 0) + 1
+            self.stats['queued'] += 1
+
+        row = {
+            'id': message_id,
+            'channel_id': channel_id,
+            'user_id': user_id,
+            'username': username,
+            'text': text,
+            'timestamp': datetime.utcnow(),
+            'is_read': False,
+            'reactions': '{}'
+        }
+        self._queue.put(row)
+        return row
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def pending_for(self, channel_id):
+        return self._pending.get(channel_id, 0)
+
+    def _settle(self, batch):
+        with self._lock:
+            for row in batch:
+                remaining = self._pending[row['channel_id']] - 1
+                if remaining:
+                    self._pending[row['channel_id']] = remaining
+                else:
+                    del self._pending[row['channel_id']]
+
+    def stop(self, timeout=10):
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("Message writer did not drain within %ss, %s messages pending",
+                         timeout, self._queue.qsize())
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            elif self._stopping.is_set():
+                return
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _insert(self, rows):
+        try:
+            db.session.execute(Message.__table__.insert(), rows)
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to write %s messages", len(rows))
+            return False
+
+    def _flush(self, batch):
+        with self.app.app_context():
+            try:
+                delay = self.retry_backoff
+                for attempt in range(self.retries + 1):
+                    if self._insert(batch):
+                        self.stats['written'] += len(batch)
+                        self.stats['batches'] += 1
+                        return
+                    if attempt < self.retries:
+                        self.stats['retries'] += 1
+                        logger.warning("Retrying batch of %s messages in %.2fs", len(batch), delay)
+                        time.sleep(delay)
+                        delay = min(delay * 2, self.retry_backoff_max)
+
+                failed = [row for row in batch if not self._insert([row])]
+                self.stats['written'] += len(batch) - len(failed)
+                self.stats['failed'] += len(failed)
+                if failed:
+                    logger.error("Dropped %s of %s messages after %s retries: %s", len(failed), len(batch),
+                                 self.retries, [row['id'] for row in failed])
+                    for channel_id in {row['channel_id'] for row in failed}:
+                        history_cache.invalidate(channel_id)
+
+            finally:
+                db.session.remove()
+                self._settle(batch)
+
+message_writer = MessageWriter()
\ No newline at end of file
@@ -265,6 +265,12 @@ export const setupWebSocketHandlers = (socket, handlers) => {
         }
     })
 
+    socket.on('presence_delta', (data) => {
+        if (handlers.onPresenceDelta) {
+            handlers.onPresenceDelta(data)
+        }
+    })
+
     socket.on('reaction_update', (data) => {
         if (handlers.onReactionUpdate) {
             handlers.onReactionUpdate(data)
@@ -276,6 +282,20 @@ export const setupWebSocketHandlers = (socket, handlers) => {
             handlers.onMessagesRead(data)
         }
     })
+
+    const batchHandlers = {
+        message: handlers.onMessage,
+        reaction_update: handlers.onReactionUpdate,
+        typing_update: handlers.onTypingUpdate
+    }
+
+    socket.on('batch', (data) => {
+        data.events.forEach(([event, payload]) => {
+            if (batchHandlers[event]) {
+                batchHandlers[event](payload)
+            }
+        })
+    })
 }
 
 let typingTimeout = null
@@ -299,6 +319,10 @@ export const sendTypingIndicator = (socket, channelId, isTyping) => {
     }
 }
 
+export const subscribeChannels = (socket, channelIds) => {
+    socket.emit('subscribe', { channels: channelIds })
+}
+
 export const joinChannel = (socket, channelId) => {
     socket.emit('join_channel', { channel_id: channelId })
 }
@@ -476,6 +500,22 @@ export const updateOnlineUsers = (users) => {
     return onlineList
 }
 
+export const applyPresenceDelta = (users, delta) => {
+    const onlineList = { ...users }
+    Object.entries(delta.updated || {}).forEach(([userId, userData]) => {
+        if (userData.status === 'online') {
+            onlineList[userId] = userData
+        } else {
+            delete onlineList[userId]
+        }
+    })
+    const removed = delta.removed || []
+    removed.forEach(userId => {
+        delete onlineList[userId]
+    })
+    return onlineList
+}
+
 export const createNewMessage = (username, text, userId = null) => {
     return {
         id: `temp-${Date.now()}`,
@@ -4,10 +4,10 @@ import { StarryBackground, ChatSidebar, ChatMain } from '../helpers/components.j
 import {
     connectWebSocket, setupWebSocketHandlers, handleLogout, sendMessage,
     initializeDashboardData, getChatDisplayName, createNewMessage,
-    addMessageToChat, sendTypingIndicator, joinChannel, leaveChannel,
+    addMessageToChat, sendTypingIndicator, subscribeChannels, joinChannel, leaveChannel,
     addReaction, loadMessages, updateMessageReactions, updateTypingUsers,
-    updateUnreadCounts, updateOnlineUsers, playNotificationSound,
-    getInitialMessagesForChat
+    updateUnreadCounts, updateOnlineUsers, applyPresenceDelta, playNotificationSound,
+    getInitialMessagesForChat, getUsername
 } from '../helpers/utility.jsx'
 
 function Dashboard() {
@@ -82,7 +82,7 @@ function Dashboard() {
 
                 socketRef.current = socketInstance
                 setupSocketHandlers(socketInstance)
-                joinChannel(socketInstance, activeChat)
+                subscribeChannels(socketInstance, [activeChat])
                 loadInitialMessages()
                 simulateDemoActivity()
             } else if (status === 'auth_error' || status === 'token_expired') {
@@ -96,7 +96,8 @@ function Dashboard() {
             onMessage: handleIncomingMessage,
             onConnectionResponse: (data) => {},
             onTypingUpdate: (data) => {
-                setTypingUsers(prev => updateTypingUsers(prev, data.channel_id, data.typing_users))
+                const others = data.typing_users.filter(name => name !== getUsername())
+                setTypingUsers(prev => updateTypingUsers(prev, data.channel_id, others))
             },
             onPresenceUpdate: (data) => {
                 setOnlineUsers(prev => ({
@@ -104,6 +105,12 @@ function Dashboard() {
                     'erik_ai': { username: 'erik_ai', status: 'online' }
                 }))
             },
+            onPresenceDelta: (data) => {
+                setOnlineUsers(prev => ({
+                    ...applyPresenceDelta(prev, data),
+                    'erik_ai': { username: 'erik_ai', status: 'online' }
+                }))
+            },
             onReactionUpdate: (data) => {
                 updateReaction(data)
             },